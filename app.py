@@ -12,17 +12,21 @@ Usage:
 """
 import asyncio
 import logging
-from config import DISCORD_TOKEN, WEB_PORT, WHISPER_MODEL, WHISPER_DEVICE, OLLAMA_MODEL
+from config import DISCORD_TOKEN, WEB_PORT, WHISPER_MODEL, WHISPER_DEVICE, OLLAMA_MODEL, OLLAMA_REPROBE_INTERVAL
 
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s',
     handlers=[
         logging.StreamHandler(),
         logging.FileHandler('jarvis.log', encoding='utf-8')
     ]
 )
+# Trace ID on every line (joins one request's logs across web / bot)
+from core.tracing import TraceLogFilter
+for handler in logging.getLogger().handlers:
+    handler.addFilter(TraceLogFilter())
 logger = logging.getLogger(__name__)
 
 
@@ -42,33 +46,54 @@ def print_banner():
     """)
 
 
-async def preload_models():
-    """Preload AI models."""
-    logger.info("⏳ Loading AI models...")
-    
-    # Check FFmpeg
+def check_ffmpeg():
+    """Check FFmpeg binary."""
     import os
     from config import FFMPEG_PATH
     if os.path.exists(FFMPEG_PATH):
         logger.info(f"✅ FFmpeg found: {FFMPEG_PATH}")
     else:
         logger.warning(f"⚠️ FFmpeg not found at: {FFMPEG_PATH}")
-    
-    # Load Whisper
+
+
+async def load_whisper():
+    """Load Whisper in the background (one model per STT worker)."""
+    from core.readiness import readiness
+    readiness.loading("whisper")
     try:
-        from ear.transcriber import transcriber
-        transcriber.load()
+        from ear.pool import pool
+        await pool.start()
+        readiness.ready("whisper")
         logger.info("✅ Whisper loaded")
     except Exception as e:
+        readiness.failed("whisper", e)
         logger.warning(f"Whisper preload: {e}")
-    
-    # Test Ollama
-    try:
-        import ollama
-        ollama.list()
-        logger.info("✅ Ollama connected")
-    except Exception as e:
-        logger.error(f"❌ Ollama: {e}")
+
+
+async def probe_llm(retry: float = OLLAMA_REPROBE_INTERVAL):
+    """
+    Check Ollama in the background (shared async client).
+    Re-probes every `retry` seconds until it answers - the LLM tier stays off
+    while "llm" isn't ready, so a slow cold load must not disable it for good.
+    """
+    from core.readiness import readiness
+    from brain.llm import llm
+    while True:
+        readiness.loading("llm")
+        try:
+            await asyncio.wait_for(llm.client.list(), llm.timeout)
+            logger.info("✅ Ollama connected")
+            # Load the model + system prompt now, not on the first voice command
+            await llm.warmup()
+            readiness.ready("llm")
+            return
+        except Exception as e:
+            readiness.failed("llm", e)
+            if retry <= 0:
+                logger.error(f"❌ Ollama: {e}")
+                return
+            logger.error(f"❌ Ollama: {e} (retry in {retry:g}s)")
+        await asyncio.sleep(retry)
 
 
 async def main():
@@ -79,8 +104,24 @@ async def main():
         logger.error("❌ DISCORD_TOKEN not set in .env")
         return
         
-    # Preload models
-    await preload_models()
+    check_ffmpeg()
+    
+    # Load models in the background - web server accepts connections immediately
+    # (text commands work right away, /api/ready reports progress)
+    logger.info("⏳ Loading AI models in background...")
+    preload_tasks = [
+        asyncio.create_task(load_whisper()),
+        asyncio.create_task(probe_llm())
+    ]
+    
+    # Pick up intents.json edits without a restart (no Whisper reload)
+    from core.commands import registry
+    preload_tasks.append(asyncio.create_task(registry.watch()))
+    
+    # Keep the LLM resident while someone has the web page open
+    from brain.llm import llm
+    from web.fanout import broadcaster
+    preload_tasks.append(asyncio.create_task(llm.keep_warm(active=lambda: bool(broadcaster.clients))))
     
     # Start both servers
     logger.info("🚀 Starting Jarvis...")
@@ -89,10 +130,15 @@ async def main():
     from web.server import run_server
     
     # Run Discord bot and web server concurrently
-    await asyncio.gather(
-        run_bot(),
-        run_server()
-    )
+    try:
+        await asyncio.gather(
+            run_bot(),
+            run_server()
+        )
+    finally:
+        for task in preload_tasks:
+            task.cancel()
+        await llm.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+"""
+Benchmark helpers - shared by benchmark_stt.py, benchmark_load.py and benchmark_llm.py
+"""
+import os
+import socket
+import subprocess
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentiles(samples: list, digits: int = 2) -> dict:
+    """Latency summary in milliseconds (values are None without samples)."""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None, "n": 0}
+    ms = np.array(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), digits),
+        "p95_ms": round(float(np.percentile(ms, 95)), digits),
+        "p99_ms": round(float(np.percentile(ms, 99)), digits),
+        "mean_ms": round(float(ms.mean()), digits),
+        "max_ms": round(float(ms.max()), digits),
+        "n": len(samples),
+    }
+
+
+def git_commit() -> str | None:
+    """Short hash of the checked-out commit (recorded in every report)."""
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def free_port() -> int:
+    """Unused local TCP port for a server started by the benchmark."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+LLM benchmark - วัด brain/llm.py กับ mock_ollama.py (ไม่ต้องมี GPU / network)
+
+Scenarios, each at every --concurrency level:
+  chat_stream      LLM.chat, streamed with early stop at the verdict
+  chat_full        LLM.chat, whole response
+  process_command  brain.process_command (rules -> cached verdict -> LLM)
+  timeout          client timeout below the mock's time-to-first-token
+  sync_baseline    blocking ollama.Client.chat on the event loop (previous implementation)
+
+Reports latency percentiles, throughput, timeouts / errors and event-loop lag
+(a 5 ms ticker running next to the requests - a blocked loop shows up as lag).
+
+Usage:
+  python benchmark_llm.py
+  python benchmark_llm.py --concurrency 1,8,32 --requests 100 --think-tokens 60
+  python benchmark_llm.py --ttft-ms 0 --tps 0          # pure client + HTTP overhead
+  python benchmark_llm.py --host http://127.0.0.1:11434 --model deepseek-r1:8b --scenarios chat_stream
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_common import free_port, git_commit, percentiles
+
+SCENARIOS = ("chat_stream", "chat_full", "process_command", "timeout", "sync_baseline")
+NATURAL = ["ช่วย{}หน่อยครับ", "{}ได้ไหม", "jarvis {} เลย"]
+UNKNOWN = ["วันนี้อากาศดีนะ", "ขอบคุณมากครับ", "what time is it"]
+
+
+class LoopLag:
+    """Measures how late a periodic sleep wakes up (event-loop blocking)."""
+
+    def __init__(self, period: float = 0.005):
+        self.period = period
+        self.samples = []
+        self._task = None
+        self._sleeping_since = None
+
+    async def _run(self):
+        while True:
+            self._sleeping_since = time.perf_counter()
+            await asyncio.sleep(self.period)
+            self.samples.append(time.perf_counter() - self._sleeping_since - self.period)
+
+    def start(self):
+        self.samples.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        # A loop blocked until now never woke the ticker - count the pending sleep too
+        if self._sleeping_since is not None:
+            self.samples.append(max(0.0, time.perf_counter() - self._sleeping_since - self.period))
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        if not self.samples:
+            return {"p99_ms": None, "max_ms": None}
+        ms = np.array(self.samples) * 1000
+        return {"p99_ms": round(float(np.percentile(ms, 99)), 2), "max_ms": round(float(ms.max()), 2)}
+
+
+def llm_inputs() -> list[str]:
+    """Natural-language variants of the LLM command phrases (the rules miss these) + unknowns."""
+    from brain.llm import llm_commands
+    phrases = [phrase for phrase, _, _ in llm_commands()]
+    return [template.format(phrase) for phrase in phrases for template in NATURAL] + UNKNOWN
+
+
+def mixed_inputs() -> list[str]:
+    """process_command traffic: rule hits interleaved with LLM-only text."""
+    from core.commands import command_phrases
+    exact, _ = command_phrases()
+    natural = llm_inputs()
+    return [text for pair in zip(exact, natural) for text in pair]
+
+
+async def run_level(call, inputs: list, concurrency: int, requests: int) -> dict:
+    """requests calls spread over concurrency workers; latency per call + loop lag."""
+    latencies = []
+    failures = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            text = inputs[i % len(inputs)]
+            start = time.perf_counter()
+            try:
+                await call(text)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+
+    lag = LoopLag()
+    lag.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "throughput_per_sec": round(requests / elapsed, 2),
+        "latency": percentiles(latencies),
+        "failures": failures,
+        "loop_lag": await lag.stop(),
+    }
+
+
+def counter_delta(before: dict, after: dict, keys: tuple) -> dict:
+    return {key: after[key] - before[key] for key in keys}
+
+
+async def run_scenario(name: str, args, url: str, levels: list[int]) -> list[dict]:
+    from brain.llm import LLM
+    from brain.resolver import resolver
+    from brain import process_command
+
+    llm_keys = ("requests", "early_stops", "timeouts", "errors")
+    results = []
+
+    if name == "sync_baseline":
+        import ollama
+        client = ollama.Client(host=url)
+        prompt = LLM(model=args.model, host=url).system_prompt
+
+        async def call(text):
+            # Blocks the event loop for the whole request (what LLM.chat used to do)
+            client.chat(model=args.model, messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": text}
+            ], options={"temperature": 0.0})
+
+        result = await run_level(call, llm_inputs(), 1, min(args.requests, 10))
+        return [result]
+
+    if name == "process_command":
+        llm = resolver.llm
+        inputs = mixed_inputs()
+
+        async def call(text):
+            return await process_command(text)
+    else:
+        timeout = args.ttft_ms / 2000 if name == "timeout" else args.timeout
+        llm = LLM(model=args.model, host=url, timeout=timeout, stream=name != "chat_full")
+        inputs = llm_inputs()
+        call = llm.chat
+        if name != "timeout":
+            await llm.warmup()
+
+    for concurrency in levels:
+        resolver.clear()
+        tiers_before = dict(resolver.tiers)
+        before = llm.stats()
+        result = await run_level(call, inputs, concurrency, args.requests)
+        after = llm.stats()
+        result["llm"] = counter_delta(before, after, llm_keys)
+        result["llm"]["in_flight_after"] = after["in_flight"]
+        if name == "process_command":
+            result["tiers"] = {tier: resolver.tiers[tier] - tiers_before[tier] for tier in resolver.tiers}
+        results.append(result)
+
+    if llm is not resolver.llm:
+        await llm.close()
+    return results
+
+
+def start_mock(args) -> tuple[subprocess.Popen, str]:
+    """mock_ollama.py in its own process (its event loop doesn't share ours)."""
+    port = free_port()
+    mock = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_ollama.py")
+    cmd = [sys.executable, mock, "--port", str(port), "--model", args.model,
+           "--ttft-ms", str(args.ttft_ms), "--tps", str(args.tps),
+           "--think-tokens", str(args.think_tokens), "--trailing-tokens", str(args.trailing_tokens),
+           "--load-ms", str(args.load_ms)]
+    return subprocess.Popen(cmd), f"http://127.0.0.1:{port}"
+
+
+def wait_ready(url: str, timeout: float = 30):
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/api/tags", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"No Ollama API at {url}")
+
+
+async def run_all(args, url: str) -> dict:
+    from core.readiness import readiness
+    from brain.resolver import resolver
+
+    # Shared client used by process_command: warm it up like app.py does
+    readiness.loading("llm")
+    await resolver.llm.warmup()
+    readiness.ready("llm")
+
+    levels = [int(x) for x in args.concurrency.split(",")]
+    results = {}
+    for name in args.scenarios.split(","):
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name} (expected {', '.join(SCENARIOS)})")
+        if name == "timeout" and args.ttft_ms <= 0:
+            continue
+        results[name] = await run_scenario(name, args, url, levels)
+        for r in results[name]:
+            lat, lag = r["latency"], r["loop_lag"]
+            p50 = f"{lat['p50_ms']:8.1f}" if lat["p50_ms"] is not None else "       -"
+            print(f"  {name:15} c={r['concurrency']:<3} {r['throughput_per_sec']:7.1f}/s | p50 {p50} ms | "
+                  f"timeouts {r.get('llm', {}).get('timeouts', 0):3} | errors {sum(r['failures'].values()) + r.get('llm', {}).get('errors', 0):3} | "
+                  f"loop lag max {lag['max_ms']:7.1f} ms", file=sys.stderr)
+
+    await resolver.llm.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="brain/llm.py benchmark against a mock Ollama")
+    parser.add_argument("--host", help="Use this Ollama server instead of starting mock_ollama.py")
+    parser.add_argument("--model", default="mock", help="Model name sent with each request")
+    parser.add_argument("--concurrency", default="1,4,16", help="Concurrent callers per level")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per level")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Scenarios to run")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client timeout (seconds)")
+    parser.add_argument("--ttft-ms", type=float, default=150.0, help="Mock time to first token")
+    parser.add_argument("--tps", type=float, default=40.0, help="Mock tokens per second (0 = instant)")
+    parser.add_argument("--think-tokens", type=int, default=30, help="Mock <think> preamble length")
+    parser.add_argument("--trailing-tokens", type=int, default=20, help="Mock chatter after the answer")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Mock cold load after keep_alive expires")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    # Per-request INFO lines (HTTP requests, TTFT, timeouts) would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("brain").setLevel(logging.ERROR)
+
+    proc = None
+    url = args.host
+    if not url:
+        proc, url = start_mock(args)
+    try:
+        wait_ready(url)
+        # brain/llm.py reads the host and model from config at import time
+        os.environ["OLLAMA_HOST"] = url
+        os.environ["OLLAMA_MODEL"] = args.model
+        print(f"\n🤖 Jarvis LLM Benchmark ({url}, model {args.model})\n", file=sys.stderr)
+        results = asyncio.run(run_all(args, url))
+
+        mock_stats = None
+        if proc:
+            import httpx
+            mock_stats = httpx.get(f"{url}/mock/stats", timeout=5).json()
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "target": args.host or "mock_ollama.py",
+            "model": args.model,
+            "mock": None if args.host else {
+                "ttft_ms": args.ttft_ms, "tps": args.tps,
+                "think_tokens": args.think_tokens, "trailing_tokens": args.trailing_tokens,
+                "load_ms": args.load_ms,
+            },
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+        "mock_stats": mock_stats,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n  Saved: {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
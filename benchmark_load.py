@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Load test - จำลองผู้ใช้ push-to-talk หลายคนพร้อมกัน (capacity planning)
+
+Each virtual user holds one /ws/voice connection and sends commands at
+--rate / --clients per second: typed text, synthetic audio (binary frames)
+or POST /api/command, mixed by --mix. Latency is measured from the *scheduled*
+send time to the final reply, so a saturated server shows up as latency rather
+than as a silently lower send rate.
+
+Without --url a local server is started in a subprocess with the Discord side
+stubbed out (commands are drained from command_queue, no bot / network needed).
+
+Usage:
+  python benchmark_load.py --clients 20 --rate 10 --duration 30
+  python benchmark_load.py --mix text=1                       # no Whisper needed
+  python benchmark_load.py --url http://jarvis.local:8080 --clients 5 --output load.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_common import free_port, git_commit, percentiles
+
+TYPES = ("text", "audio", "api")
+# Replies that end a command on /ws/voice (transcription / partial / state are intermediate)
+TERMINAL = {"response", "error", "busy", "loading", "final"}
+REJECTED = {"busy", "loading"}
+UNKNOWN_PHRASES = ["วันนี้อากาศดีนะ", "ขอบคุณครับ", "hello jarvis"]
+FRAME_BYTES = 16 * 1024
+
+
+# --- Stub server (--serve) ---
+
+async def stub_discord(execute_ms: float):
+    """Stand-in for hand.discord_bot.process_commands: drain the queue, update state."""
+    from config import VOLUME_STEP
+    from web.server import command_queue
+    from core.state import state
+
+    command_queue.volume_level = lambda: state.state["volume"]
+    while True:
+        cmd = await command_queue.get()
+        func = cmd.get("function")
+        args = cmd.get("args", {})
+        trace = cmd.get("trace")
+        start = time.perf_counter()
+        await asyncio.sleep(execute_ms / 1000)
+
+        # Same state pushes as the real bot, so fan-out load is realistic
+        if func == "play_music":
+            state.update(song=args.get("song_name"), playing=True, paused=False)
+        elif func in ("stop_music", "skip"):
+            state.update(song=None, playing=False, paused=False)
+        elif func == "pause_music":
+            state.update(paused=True)
+        elif func == "resume_music":
+            state.update(paused=False)
+        elif func == "set_volume":
+            state.update(volume=args.get("level", 50))
+        elif func in ("volume_up", "volume_down"):
+            step = VOLUME_STEP if func == "volume_up" else -VOLUME_STEP
+            state.update(volume=max(0, min(100, state.state["volume"] + step)))
+
+        if trace is not None:
+            trace.add_span("execute", start, time.perf_counter(), function=func, stub=True)
+            trace.finish()
+
+
+async def serve(stt: bool, execute_ms: float):
+    """Web server + stub Discord consumer (+ Whisper when audio is in the mix)."""
+    from app import load_whisper  # Same loader / readiness sequence as the app
+    from web.server import run_server
+    from core.state import state
+
+    tasks = [asyncio.create_task(stub_discord(execute_ms))]
+    if stt:
+        tasks.append(asyncio.create_task(load_whisper()))
+    state.update(discord=True, voice=True, voice_channel="load-test")
+    try:
+        await run_server()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def start_local_server(stt: bool, execute_ms: float) -> tuple[subprocess.Popen, str]:
+    """Spawn this script with --serve on a free port (separate process = separate CPU)."""
+    port = free_port()
+    env = {**os.environ, "WEB_HOST": "127.0.0.1", "WEB_PORT": str(port)}
+    cmd = [sys.executable, os.path.abspath(__file__), "--serve", "--execute-ms", str(execute_ms)]
+    if stt:
+        cmd.append("--stt")
+    proc = subprocess.Popen(cmd, env=env)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(session, url: str, stt: bool, timeout: float = 300):
+    """Poll /api/status until the server answers (and Whisper is loaded, if needed)."""
+    import aiohttp
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/api/status") as resp:
+                status = await resp.json()
+            whisper = status.get("components", {}).get("whisper", {}).get("state")
+            if whisper == "failed" and stt:
+                raise RuntimeError(f"Whisper failed to load: {status['components']['whisper'].get('error')}")
+            if not stt or whisper == "ready":
+                return status
+        except (aiohttp.ClientError, OSError):
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server at {url} not ready after {timeout:.0f}s")
+
+
+# --- Workload ---
+
+def text_phrases() -> list[str]:
+    """Known command phrases (+ a few the matcher should ignore)."""
+    from core.commands import registry, command_phrases
+
+    exact, _ = command_phrases()
+    spec = registry.spec
+    play, volume = spec["patterns"]["play"]["prefixes"], spec["patterns"]["volume"]["prefixes"]
+    phrases = list(exact) + [f"{play[0]} ลาบานูน", f"{volume[0]} 40"]
+    return phrases + UNKNOWN_PHRASES
+
+
+def audio_clips(lengths: list[float]) -> list[bytes]:
+    """Deterministic synthetic WebM clips (same generator as benchmark_stt.py)."""
+    from benchmark_stt import synth_clip, encode
+    return [encode(synth_clip(seconds, seed=i), "webm") for i, seconds in enumerate(lengths)]
+
+
+def audio_frames(clip: bytes, stream: bool) -> list[bytes]:
+    """Split a clip into /ws/voice binary frames, END flag on the last one."""
+    from web.framing import build_frame, FLAG_END, FLAG_STREAM
+
+    flags = FLAG_STREAM if stream else 0
+    chunks = [clip[i:i + FRAME_BYTES] for i in range(0, len(clip), FRAME_BYTES)]
+    frames = [build_frame(seq, chunk, codec=1, flags=flags) for seq, chunk in enumerate(chunks)]
+    frames.append(build_frame(len(chunks), b"", codec=1, flags=flags | FLAG_END))
+    return frames
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in TYPES:
+            raise ValueError(f"Unknown message type in --mix: {name} (expected {', '.join(TYPES)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: w / total for name, w in weights.items() if w > 0}
+
+
+class Results:
+    """Per message type latency samples and outcome counts."""
+
+    def __init__(self):
+        self.latency = {t: [] for t in TYPES}
+        self.counts = {t: {"sent": 0, "ok": 0, "rejected": 0, "errors": 0} for t in TYPES}
+        self.replies = {t: {} for t in TYPES}
+        self.error_kinds = {}
+
+    def reply(self, kind: str, reply_type: str, latency: float):
+        self.replies[kind][reply_type] = self.replies[kind].get(reply_type, 0) + 1
+        if reply_type in REJECTED:
+            self.counts[kind]["rejected"] += 1
+        else:
+            self.counts[kind]["ok"] += 1
+            self.latency[kind].append(latency)
+
+    def error(self, kind: str, reason: str):
+        self.counts[kind]["errors"] += 1
+        self.error_kinds[reason] = self.error_kinds.get(reason, 0) + 1
+
+
+async def virtual_user(uid: int, session, url: str, args, mix: dict, phrases: list, frames: list,
+                       results: Results, start_at: float, stop_at: float):
+    """One push-to-talk user: open-loop schedule, one command in flight at a time."""
+    import aiohttp
+
+    rng = random.Random(uid)
+    interval = args.clients / args.rate
+    kinds, weights = list(mix), list(mix.values())
+    ws_url = url.replace("http", "ws", 1) + "/ws/voice"
+    ws = None
+    # Spread users over the first interval so they don't fire in lockstep
+    scheduled = start_at + rng.random() * interval
+
+    try:
+        while scheduled < stop_at:
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind = rng.choices(kinds, weights)[0]
+            measured = time.monotonic() >= start_at + args.warmup
+            if measured:
+                results.counts[kind]["sent"] += 1
+            try:
+                if kind == "api":
+                    async with session.post(f"{url}/api/command", json={"text": rng.choice(phrases)}) as resp:
+                        if resp.status != 200:
+                            raise RuntimeError(f"http_{resp.status}")
+                        data = await resp.json()
+                    reply_type = "response" if data.get("status") == "success" else "ignored"
+                else:
+                    if ws is None or ws.closed:
+                        ws = await session.ws_connect(ws_url)
+                    if kind == "text":
+                        await ws.send_str(json.dumps({"type": "text", "text": rng.choice(phrases)}))
+                    else:
+                        for frame in rng.choice(frames):
+                            await ws.send_bytes(frame)
+                    reply_type = await asyncio.wait_for(wait_terminal(ws), args.timeout)
+                if measured:
+                    # From the scheduled time: a late send counts as latency
+                    results.reply(kind, reply_type, time.monotonic() - scheduled)
+            except asyncio.TimeoutError:
+                if measured:
+                    results.error(kind, "timeout")
+                # A late reply would be taken for the next command's - start over
+                if ws is not None:
+                    await ws.close()
+                    ws = None
+            except (aiohttp.ClientError, RuntimeError, ConnectionError) as e:
+                if measured:
+                    results.error(kind, str(e) if isinstance(e, RuntimeError) else type(e).__name__)
+                if ws is not None:
+                    await ws.close()
+                    ws = None
+            scheduled += interval
+    finally:
+        if ws is not None:
+            await ws.close()
+
+
+async def wait_terminal(ws) -> str:
+    """Read until the reply that ends the current command."""
+    import aiohttp
+
+    async for msg in ws:
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            continue
+        reply_type = json.loads(msg.data).get("type")
+        if reply_type in TERMINAL:
+            return reply_type
+    raise ConnectionError("websocket closed")
+
+
+def summarize(results: Results, seconds: float) -> dict:
+    summary = {}
+    for kind in TYPES:
+        counts = results.counts[kind]
+        if not counts["sent"]:
+            continue
+        failed = counts["errors"] + counts["rejected"]
+        summary[kind] = {
+            **counts,
+            "throughput_per_sec": round((counts["ok"] + counts["rejected"]) / seconds, 2),
+            "error_rate": round(failed / counts["sent"], 4),
+            "latency": percentiles(results.latency[kind], digits=1),
+            "replies": results.replies[kind],
+        }
+    sent = sum(c["sent"] for c in results.counts.values())
+    failed = sum(c["errors"] + c["rejected"] for c in results.counts.values())
+    summary["all"] = {
+        "sent": sent,
+        "throughput_per_sec": round((sent - sum(c["errors"] for c in results.counts.values())) / seconds, 2),
+        "error_rate": round(failed / sent, 4) if sent else None,
+        "latency": percentiles([s for samples in results.latency.values() for s in samples], digits=1),
+        "error_kinds": results.error_kinds,
+    }
+    return summary
+
+
+async def run_load(args, url: str, stt: bool) -> dict:
+    import aiohttp
+
+    mix = parse_mix(args.mix)
+    phrases = text_phrases()
+    frames = []
+    if "audio" in mix:
+        lengths = [float(x) for x in args.audio_lengths.split(",")]
+        frames = [audio_frames(clip, args.stream) for clip in audio_clips(lengths)]
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_ready(session, url, stt)
+        print(f"  Server ready: {url}", file=sys.stderr)
+
+        results = Results()
+        start_at = time.monotonic() + 0.5
+        stop_at = start_at + args.warmup + args.duration
+        users = [
+            virtual_user(uid, session, url, args, mix, phrases, frames, results, start_at, stop_at)
+            for uid in range(args.clients)
+        ]
+        await asyncio.gather(*users)
+
+        try:
+            async with session.get(f"{url}/api/status") as resp:
+                server = await resp.json()
+        except Exception:
+            server = None
+
+    return {"summary": summarize(results, args.duration), "server": server}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent push-to-talk load test")
+    parser.add_argument("--url", help="Target server (default: local server with stubbed Discord)")
+    parser.add_argument("--clients", type=int, default=10, help="Concurrent WebSocket users")
+    parser.add_argument("--rate", type=float, default=5.0, help="Total commands per second (all users)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds sent but not measured")
+    parser.add_argument("--mix", default="text=0.6,audio=0.3,api=0.1", help="Message type weights")
+    parser.add_argument("--audio-lengths", default="1,2,3", help="Synthetic clip lengths in seconds")
+    parser.add_argument("--stream", action="store_true", help="Send audio with the STREAM flag (partials)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for a reply")
+    parser.add_argument("--execute-ms", type=float, default=20.0, help="Stub Discord execution time per command")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--stt", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        logging.basicConfig(level=logging.WARNING)
+        asyncio.run(serve(args.stt, args.execute_ms))
+        return
+
+    stt = "audio" in parse_mix(args.mix)
+    print(f"\n🤖 Jarvis Load Test ({args.clients} clients, {args.rate:g} cmd/s, mix {args.mix})\n", file=sys.stderr)
+
+    proc = None
+    url = args.url
+    if not url:
+        proc, url = start_local_server(stt, args.execute_ms)
+    try:
+        run = asyncio.run(run_load(args, url.rstrip("/"), stt))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    for kind, s in run["summary"].items():
+        lat = s["latency"]
+        if not lat["n"]:
+            print(f"  {kind:5} sent {s['sent']:5}  no successful replies  error rate {s['error_rate']}", file=sys.stderr)
+            continue
+        print(f"  {kind:5} sent {s['sent']:5} | {s['throughput_per_sec']:6.2f}/s | errors {s['error_rate'] * 100:5.1f}% | "
+              f"p50 {lat['p50_ms']:7.1f} | p95 {lat['p95_ms']:7.1f} | p99 {lat['p99_ms']:7.1f} ms", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "target": args.url or "local (stub Discord)",
+            "clients": args.clients,
+            "rate": args.rate,
+            "duration": args.duration,
+            "mix": parse_mix(args.mix),
+            "stream": args.stream,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        **run,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n  Saved: {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Matcher benchmark - จำนวน match ต่อวินาทีของ match_command_simple
+เทียบกับ implementation เดิม (scan list ทุกครั้ง) และตรวจว่าผลลัพธ์ตรงกัน
+
+Usage:
+  python benchmark_matcher.py
+  python benchmark_matcher.py --seconds 3
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.commands import registry, command_phrases, match_command_simple
+
+
+def match_linear(text: str) -> dict | None:
+    """Previous implementation: linear list scans on every call (baseline)."""
+    spec = registry.spec
+    play, volume = spec["patterns"]["play"], spec["patterns"]["volume"]
+    cmd = text.strip().lower()
+    for noise in spec["noise_words"]:
+        cmd = cmd.replace(noise, "")
+    cmd = cmd.strip()
+
+    if any(cmd.startswith(p) for p in volume["prefixes"]):
+        match = re.search(r'\d+', cmd)
+        if match:
+            level = int(match.group())
+            return {"function": volume["function"], "args": {volume["arg"]: level},
+                    "response": volume["response"].format(**{volume["arg"]: level})}
+
+    for entry in spec["intents"] + [dict(play["bare"], keywords=play["prefixes"])]:
+        if cmd in entry["keywords"]:
+            return {"function": entry["function"], "args": dict(entry.get("args", {})), "response": entry["response"]}
+
+    for prefix in play["prefixes"]:
+        if cmd.startswith(prefix):
+            song = cmd[len(prefix):].strip()
+            if song:
+                return {"function": play["function"], "args": {play["arg"]: song},
+                        "response": play["response"].format(**{play["arg"]: song})}
+
+    for entry in spec["legacy"]:
+        if cmd in entry["keywords"]:
+            return {"function": entry["function"], "args": dict(entry.get("args", {})), "response": entry["response"]}
+    return None
+
+
+def corpus() -> list[str]:
+    """Realistic mix: every command, with particles, play + song, volume, misses."""
+    exact, _ = command_phrases()
+    patterns = registry.spec["patterns"]
+    texts = list(exact) + patterns["play"]["prefixes"]
+    texts += [f"{p} ครับ" for p in exact[:20]]
+    texts += [f"{p} ลาบานูน" for p in patterns["play"]["prefixes"]]
+    texts += [f"{p} {n}" for p in patterns["volume"]["prefixes"] for n in (10, 50, 100)]
+    texts += ["สวัสดีครับ", "วันนี้อากาศเป็นยังไง", "ขอบคุณมากครับบอท", "", "   "]
+    return texts
+
+
+def typos(phrases: list[str]) -> list[str]:
+    """Whisper-style near misses: one dropped / doubled character per phrase."""
+    out = []
+    for p in phrases:
+        if len(p) >= 5:
+            out += [p[:-1], p + p[-1], p[:2] + p[3:]]
+    return out
+
+
+def same(indexed: dict | None, linear: dict | None) -> bool:
+    """Indexed result equals the baseline (ignoring confidence; fuzzy may rescue a miss)."""
+    if linear is None:
+        return indexed is None or indexed.get("confidence", 1.0) < 1.0
+    return indexed is not None and {k: v for k, v in indexed.items() if k != "confidence"} == linear
+
+
+def rate(func, texts: list[str], seconds: float) -> float:
+    """Matches per second over the corpus."""
+    n = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for text in texts:
+            func(text)
+        n += len(texts)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="match_command_simple throughput")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time per implementation")
+    args = parser.parse_args()
+
+    texts = corpus()
+    mismatches = [t for t in texts if not same(match_command_simple(t), match_linear(t))]
+    near = typos(command_phrases()[0])
+
+    print(f"\n🤖 Jarvis Matcher Benchmark ({len(texts)} inputs)\n")
+    baseline = rate(match_linear, texts, args.seconds)
+    indexed = rate(match_command_simple, texts, args.seconds)
+    print(f"  linear scan : {baseline:12,.0f} matches/s ({1e6 / baseline:6.2f} µs/match)")
+    print(f"  intent index: {indexed:12,.0f} matches/s ({1e6 / indexed:6.2f} µs/match)")
+    print(f"  speedup     : {indexed / baseline:.1f}x")
+    fuzzy = rate(match_command_simple, near, args.seconds)
+    rescued = sum(1 for t in near if match_linear(t) is None and match_command_simple(t))
+    print(f"  near misses : {fuzzy:12,.0f} matches/s ({1e6 / fuzzy:6.2f} µs/match), "
+          f"fuzzy rescued {rescued}/{len(near)}")
+    print(f"  equivalence : {'✅ identical' if not mismatches else f'❌ {len(mismatches)} differ'}")
+    for t in mismatches[:10]:
+        print(f"    {t!r}: {match_linear(t)} != {match_command_simple(t)}")
+
+
+if __name__ == "__main__":
+    main()
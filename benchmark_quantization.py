@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Quantization benchmark - เทียบความแม่นยำและ latency ของ Whisper fp32 vs int8
+ใช้ประโยคคำสั่งที่ match_command_simple รู้จัก
+
+Usage:
+  python benchmark_quantization.py                 # สร้างเสียงคำสั่งด้วย Edge-TTS
+  python benchmark_quantization.py --clips DIR     # ใช้ไฟล์เสียงจริง (ชื่อไฟล์ = ประโยคคำสั่ง)
+  python benchmark_quantization.py --all --json results.json
+
+แต่ละ variant รันใน process ใหม่ - RSS ของ int8 ไม่ปนกับ fp32 ที่โหลดก่อนหน้า
+"""
+import os
+import io
+import gc
+import sys
+import time
+import json
+import asyncio
+import argparse
+import resource
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import WHISPER_MODEL
+from core.commands import registry, command_phrases, match_command_simple
+
+
+def default_phrases(use_all: bool = False) -> list[str]:
+    """Command phrases to test: a few per intent, or every phrase with --all."""
+    spec = registry.spec
+    if use_all:
+        exact, _ = command_phrases()
+        phrases = exact
+    else:
+        phrases = []
+        for entry in spec["intents"]:
+            phrases.extend(entry["keywords"][:2])
+        phrases.extend(entry["keywords"][0] for entry in spec["legacy"][:4])
+    # Play / volume patterns
+    play, volume = spec["patterns"]["play"]["prefixes"], spec["patterns"]["volume"]["prefixes"]
+    phrases += [f"{play[min(4, len(play) - 1)]} ลาบานูน", f"{volume[0]} 50"]
+    return list(dict.fromkeys(phrases))
+
+
+def synthesize(phrases: list[str]) -> dict[str, np.ndarray]:
+    """Generate clips with Edge-TTS (needs network)."""
+    from mouth.tts import generate_speech
+    from ear.transcriber import decode_audio
+
+    async def _gen():
+        clips = {}
+        for phrase in phrases:
+            path = await generate_speech(phrase)
+            if not path:
+                print(f"  ⚠️ TTS failed: {phrase}")
+                continue
+            try:
+                clips[phrase] = decode_audio(Path(path).read_bytes(), input_format=None)
+            finally:
+                os.unlink(path)
+        return clips
+
+    return asyncio.run(_gen())
+
+
+def load_clips(directory: str) -> dict[str, np.ndarray]:
+    """Load recorded clips - file name (without extension) is the phrase."""
+    from ear.transcriber import decode_audio
+    clips = {}
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix.lower() in (".webm", ".wav", ".mp3", ".m4a", ".ogg"):
+            clips[path.stem] = decode_audio(path.read_bytes(), input_format=None)
+    return clips
+
+
+def model_size_mb(model) -> float:
+    """Serialized state_dict size."""
+    import torch
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell() / 1e6
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def rss_mb() -> float:
+    """Current resident memory (Linux), peak RSS elsewhere."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def save_clips(clips: dict[str, np.ndarray], path: str):
+    np.savez(path, *clips.values(), phrases=np.array(list(clips)))
+
+
+def read_clips(path: str) -> dict[str, np.ndarray]:
+    with np.load(path) as data:
+        return {str(phrase): data[f"arr_{i}"] for i, phrase in enumerate(data["phrases"])}
+
+
+def load_variant(name: str, model_name: str):
+    """Load the model the way the app does (WHISPER_QUANTIZE) -> (model, RSS before, RSS after)."""
+    import whisper  # noqa: F401 - torch / whisper imports are not part of the model
+    from config import WHISPER_QUANTIZE
+    from ear.transcriber import load_model
+
+    assert WHISPER_QUANTIZE == ("int8" if name == "int8" else "none"), "spawn with spawn_variant()"
+
+    before = rss_mb()
+    model = load_model(model_name)
+    gc.collect()
+    return model, before, rss_mb()
+
+
+def run_variant(name: str, model, clips: dict[str, np.ndarray]) -> dict:
+    """Transcribe every clip, score intent accuracy and latency."""
+    from ear.transcriber import Transcriber
+
+    t = Transcriber()
+    t.model = model
+
+    # Warmup
+    t.transcribe_pcm(next(iter(clips.values())))
+
+    latencies = []
+    intent_hits = 0
+    exact_hits = 0
+    rows = []
+    for phrase, pcm in clips.items():
+        start = time.perf_counter()
+        text = t.transcribe_pcm(pcm)
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+
+        expected = match_command_simple(phrase)
+        got = match_command_simple(text)
+        intent_ok = expected is not None and got is not None and got["function"] == expected["function"]
+        intent_hits += intent_ok
+        exact_hits += text.strip().lower() == phrase.lower()
+        rows.append({"phrase": phrase, "text": text, "intent_ok": intent_ok, "sec": round(elapsed, 4)})
+        print(f"  [{name}] {'✅' if intent_ok else '❌'} {phrase!r} -> {text!r} ({elapsed * 1000:.0f} ms)")
+
+    lat = np.array(latencies)
+    return {
+        "variant": name,
+        "clips": len(clips),
+        "intent_accuracy": round(intent_hits / len(clips), 4),
+        "exact_text_rate": round(exact_hits / len(clips), 4),
+        "latency_ms": {
+            "mean": round(float(lat.mean()) * 1000, 1),
+            "p50": round(float(np.percentile(lat, 50)) * 1000, 1),
+            "p95": round(float(np.percentile(lat, 95)) * 1000, 1),
+        },
+        "model_size_mb": round(model_size_mb(model), 1),
+        "rows": rows,
+    }
+
+
+def run_child(args):
+    """--variant: one variant in this (fresh) process, result JSON to --out."""
+    clips = read_clips(args.clips_file)
+    model, before, loaded = load_variant(args.variant, args.model)
+    result = run_variant(args.variant, model, clips)
+    # Loaded = steady-state footprint; peak includes the fp32 load int8 starts from
+    result["rss_mb"] = round(loaded, 1)
+    result["model_rss_mb"] = round(loaded - before, 1)
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+def spawn_variant(name: str, model_name: str, clips_file: str) -> dict | None:
+    """Run one variant in a new interpreter so nothing of the other variant stays resident."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "result.json")
+        cmd = [sys.executable, os.path.abspath(__file__), "--variant", name, "--model", model_name,
+               "--clips-file", clips_file, "--out", out]
+        # config reads these at import time -> set them before the child starts
+        env = dict(os.environ, WHISPER_DEVICE="cpu", WHISPER_QUANTIZE="int8" if name == "int8" else "none")
+        if subprocess.run(cmd, env=env).returncode != 0 or not os.path.exists(out):
+            print(f"  ❌ {name} failed")
+            return None
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper fp32 vs int8 on command phrases")
+    parser.add_argument("--clips", help="Directory of recorded clips (file name = phrase)")
+    parser.add_argument("--all", action="store_true", help="Test every command phrase")
+    parser.add_argument("--model", default=WHISPER_MODEL, help="Whisper model size")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--variant", choices=("fp32", "int8"), help=argparse.SUPPRESS)
+    parser.add_argument("--clips-file", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_child(args)
+        return
+
+    print("\n🤖 Jarvis Quantization Benchmark\n")
+    clips = load_clips(args.clips) if args.clips else synthesize(default_phrases(args.all))
+    if not clips:
+        print("❌ No clips")
+        return
+    print(f"  {len(clips)} clips, model: {args.model}\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clips_file = os.path.join(tmp, "clips.npz")
+        save_clips(clips, clips_file)
+        results = [r for r in (spawn_variant(v, args.model, clips_file) for v in ("fp32", "int8")) if r]
+    if not results:
+        return
+
+    print("\n" + "=" * 50)
+    for r in results:
+        print(f"  {r['variant']:5} intent {r['intent_accuracy'] * 100:5.1f}% | exact {r['exact_text_rate'] * 100:5.1f}% | "
+              f"p50 {r['latency_ms']['p50']:7.1f} ms | p95 {r['latency_ms']['p95']:7.1f} ms | "
+              f"size {r['model_size_mb']:7.1f} MB | RSS {r['rss_mb']:7.1f} MB (model {r['model_rss_mb']:7.1f}, "
+              f"peak {r['peak_rss_mb']:7.1f})")
+    print("=" * 50)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"  Saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
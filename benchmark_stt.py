@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+STT Benchmark - จับเวลาแต่ละขั้นของ Transcriber.transcribe (ต่อจาก test_whisper.py)
+
+Stages: container decode -> resample -> VAD -> mel spectrogram -> encoder -> decoder
+Clips are synthetic and deterministic (same seed every run), so results from
+different commits / model sizes / thread counts on the same box are comparable.
+
+Usage:
+  python benchmark_stt.py
+  python benchmark_stt.py --model tiny --threads 4 --runs 20 --output stt_bench.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_common import git_commit, percentiles
+
+from config import FFMPEG_PATH, WHISPER_MODEL
+
+SOURCE_RATE = 48000  # Browser MediaRecorder rate
+STAGES = ["decode", "resample", "decode_audio", "vad", "mel", "encoder", "decoder", "total"]
+
+
+def synth_clip(seconds: float, seed: int = 0, rate: int = SOURCE_RATE) -> np.ndarray:
+    """Deterministic speech-like signal: voiced harmonics with syllable envelope + noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 3.0 * t), 0, None)  # ~3 syllables/s
+    signal = 0.3 * voiced * envelope + 0.005 * rng.standard_normal(len(t))
+    return signal.astype(np.float32)
+
+
+def _ffmpeg(args: list, data: bytes) -> bytes:
+    cmd = [FFMPEG_PATH, '-nostdin', '-v', 'error'] + args
+    return subprocess.run(cmd, input=data, check=True, capture_output=True).stdout
+
+
+def encode(pcm: np.ndarray, fmt: str, rate: int = SOURCE_RATE) -> bytes:
+    """Encode raw PCM to the container the browser would upload."""
+    raw = ['-f', 'f32le', '-ar', str(rate), '-ac', '1', '-i', 'pipe:0']
+    if fmt == "webm":
+        return _ffmpeg(raw + ['-c:a', 'libopus', '-b:a', '128k', '-f', 'webm', 'pipe:1'], pcm.tobytes())
+    if fmt == "wav":
+        return _ffmpeg(raw + ['-c:a', 'pcm_s16le', '-f', 'wav', 'pipe:1'], pcm.tobytes())
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def stage_decode(audio: bytes, fmt: str) -> np.ndarray:
+    """Container decode only (native rate)."""
+    out = _ffmpeg(['-f', fmt, '-i', 'pipe:0', '-ac', '1', '-f', 'f32le', 'pipe:1'], audio)
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def stage_resample(pcm: np.ndarray, rate: int = SOURCE_RATE) -> np.ndarray:
+    """Resample raw PCM to 16 kHz (no container / codec work)."""
+    out = _ffmpeg(['-f', 'f32le', '-ar', str(rate), '-ac', '1', '-i', 'pipe:0',
+                   '-ar', '16000', '-f', 'f32le', 'pipe:1'], pcm.tobytes())
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def bench_clip(t, audio: bytes, fmt: str, runs: int) -> dict:
+    """Time every stage of the production path for one encoded clip."""
+    import torch
+    from ear.transcriber import decode_audio
+    from ear.vad import trim_silence
+
+    timings = {stage: [] for stage in STAGES}
+    options = t.decoding_options("th")
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings[stage].append(time.perf_counter() - start)
+        return result
+
+    for i in range(runs + 1):
+        total_start = time.perf_counter()
+        native = timed("decode", stage_decode, audio, fmt)
+        timed("resample", stage_resample, native)
+        # Production path does decode + resample in one ffmpeg pass
+        pcm = timed("decode_audio", decode_audio, audio, fmt)
+        trimmed, _ = timed("vad", trim_silence, pcm)
+        if len(trimmed) == 0:
+            trimmed = pcm
+
+        import whisper
+        mel = timed("mel", lambda: t.mel(whisper.pad_or_trim(trimmed)).unsqueeze(0))
+        with torch.no_grad():
+            features = timed("encoder", t.model.embed_audio, mel)
+            # Passing encoder output skips the encoder inside decode()
+            timed("decoder", t.model.decode, features, options)
+        timings["total"].append(time.perf_counter() - total_start)
+
+        if i == 0:
+            # First run is warmup
+            for samples in timings.values():
+                samples.clear()
+
+    return {stage: percentiles(samples) for stage, samples in timings.items() if samples}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage STT latency benchmark")
+    parser.add_argument("--model", default=WHISPER_MODEL, help="Whisper model size")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per clip")
+    parser.add_argument("--lengths", default="1,3,5,10", help="Clip lengths in seconds")
+    parser.add_argument("--formats", default="webm,wav", help="Upload encodings")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    import torch
+    from ear.transcriber import Transcriber, load_model
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    print(f"\n🤖 Jarvis STT Benchmark (model: {args.model}, threads: {torch.get_num_threads()})\n",
+          file=sys.stderr)
+    t = Transcriber()
+    t.model = load_model(args.model)
+
+    results = {}
+    for fmt in args.formats.split(","):
+        results[fmt] = {}
+        for seconds in [float(x) for x in args.lengths.split(",")]:
+            audio = encode(synth_clip(seconds), fmt)
+            stats = bench_clip(t, audio, fmt, args.runs)
+            results[fmt][f"{seconds:g}s"] = {"bytes": len(audio), "stages": stats}
+            summary = " | ".join(f"{s} {stats[s]['p50_ms']:.0f}" for s in STAGES)
+            print(f"  {fmt:4} {seconds:4g}s  p50 ms: {summary}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "model": args.model,
+            "threads": torch.get_num_threads(),
+            "runs": args.runs,
+            "torch": torch.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n  Saved: {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 """Brain module - LLM with Function Calling"""
 from .llm import LLM, process_command
-from .functions import FUNCTIONS
+from .resolver import Resolver, resolver
+from .functions import FUNCTIONS, get_functions
 
-__all__ = ['LLM', 'process_command', 'FUNCTIONS']
+__all__ = ['LLM', 'process_command', 'Resolver', 'resolver', 'FUNCTIONS', 'get_functions']
@@ -1,50 +1,42 @@
 """
 Function definitions for Jarvis
-These are the actions Jarvis can perform
+These are the actions Jarvis can perform (defined in intents.json)
 """
 
-FUNCTIONS = {
-    "play_music": {
-        "description": "เปิดเพลงจาก YouTube",
-        "parameters": {
-            "song_name": {"type": "string", "description": "ชื่อเพลงหรือศิลปิน"}
-        }
-    },
-    "stop_music": {
-        "description": "หยุดเพลงที่กำลังเล่น",
-        "parameters": {}
-    },
-    "pause_music": {
-        "description": "พักเพลง",
-        "parameters": {}
-    },
-    "resume_music": {
-        "description": "เล่นเพลงต่อ",
-        "parameters": {}
-    },
-    "set_volume": {
-        "description": "ปรับระดับเสียง",
-        "parameters": {
-            "level": {"type": "integer", "description": "ระดับเสียง 0-100"}
-        }
-    },
-    "skip": {
-        "description": "ข้ามเพลงปัจจุบัน",
-        "parameters": {}
-    },
-    "queue": {
-        "description": "เพิ่มเพลงเข้าคิว",
-        "parameters": {
-            "song_name": {"type": "string", "description": "ชื่อเพลง"}
-        }
-    }
-}
+from collections.abc import Mapping
+
+from core.commands import function_specs
+
+
+def get_functions() -> dict:
+    """Current function definitions from the intent registry."""
+    return function_specs()
+
+
+class _RegistryFunctions(Mapping):
+    """Read-only view of get_functions() - looked up on every access, so it follows reloads."""
+
+    def __getitem__(self, name: str) -> dict:
+        return function_specs()[name]
+
+    def __iter__(self):
+        return iter(function_specs())
+
+    def __len__(self) -> int:
+        return len(function_specs())
+
+    def __repr__(self) -> str:
+        return repr(function_specs())
+
+
+# Backwards compatible name for the old static table (from brain import FUNCTIONS)
+FUNCTIONS = _RegistryFunctions()
 
 
 def get_function_prompt():
     """Generate function list for system prompt."""
     lines = ["คุณสามารถเรียกใช้ฟังก์ชันต่อไปนี้:"]
-    for name, info in FUNCTIONS.items():
+    for name, info in get_functions().items():
         params = ", ".join(info["parameters"].keys())
         lines.append(f"- {name}({params}): {info['description']}")
     return "\n".join(lines)
@@ -1,22 +1,24 @@
 """
 LLM - Local Language Model using Ollama
 Handles Thai language understanding and function calling
+Async client (one keep-alive connection pool) - never blocks the event loop
 """
+import re
 import json
+import time
+import asyncio
 import logging
+import httpx
 import ollama
-from config import OLLAMA_MODEL, SYSTEM_PROMPT
+from config import (OLLAMA_MODEL, SYSTEM_PROMPT, OLLAMA_HOST, OLLAMA_TIMEOUT, OLLAMA_CONNECT_TIMEOUT,
+                    OLLAMA_MAX_CONNECTIONS, OLLAMA_STREAM, OLLAMA_KEEP_ALIVE, OLLAMA_WARMUP_TIMEOUT,
+                    OLLAMA_PING_INTERVAL)
+from core.commands import registry, llm_commands
+from core import metrics
 
 logger = logging.getLogger(__name__)
 
-
-class LLM:
-    """Local LLM using Ollama."""
-    
-    def __init__(self, model: str = None):
-        self.model = model or OLLAMA_MODEL
-        self.history = []
-        self.system_prompt = """You are NOT a chatbot.
+COMMAND_FILTER_PROMPT = """You are NOT a chatbot.
 You are NOT an assistant.
 You are a strict voice command filter for a Discord music bot.
 
@@ -33,69 +35,269 @@ You MUST follow these rules:
 8. No JSON. No additional characters.
 
 Allowed Commands (Exact Match Only):
-เล่น → play
-หยุด → pause
-ต่อ → resume
-ข้าม → skip
-เข้าห้อง → join
-ออก → leave
-เพิ่มเสียง → volume_up
-ลดเสียง → volume_down
-ล้างคิว → clear
-ดูคิว → queue
-เปิดวนซ้ำ → loop_on
-ปิดวนซ้ำ → loop_off
-สถานะ → status
+{allowed}
 
 If input does not EXACTLY match one of the allowed commands:
 Output: IGNORE
 """
 
-    async def chat(self, user_input: str) -> dict:
-        """Chat with LLM and return command."""
+IGNORE = "IGNORE"
+WARMUP_INPUT = "IGNORE"  # Any short input - only the system prompt prefix matters
+THINK_OPEN = "<think>"
+# deepseek-r1 style reasoning preamble
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.S)
+
+
+def strip_reasoning(text: str) -> str | None:
+    """Text without <think> blocks; None while a block is still open."""
+    text = _THINK_BLOCK.sub("", text)
+    if THINK_OPEN in text:
+        return None
+    return text
+
+
+class _Verdict:
+    """Decides when a (streamed) answer is final, given the allowed outputs."""
+
+    def __init__(self, outputs: set):
+        self.outputs = outputs
+        self.prefixes = {o[:i] for o in outputs for i in range(1, len(o) + 1)}
+        # Complete outputs that are also the start of a longer one (wait for more)
+        self.ambiguous = {o for o in outputs if any(p != o and p.startswith(o) for p in outputs)}
+
+    def ready(self, text: str) -> bool:
+        visible = strip_reasoning(text)
+        if visible is None:
+            return False
+        answer = visible.lstrip()
+        if not answer:
+            return False
+        word = answer.rstrip()
+        if word != answer:
+            # Whitespace after the first word - the answer is complete
+            return True
+        if THINK_OPEN.startswith(word):
+            return False
+        if word not in self.prefixes:
+            # Can't become an allowed command any more -> IGNORE
+            return True
+        return word in self.outputs and word not in self.ambiguous
+
+
+class LLM:
+    """Local LLM using Ollama."""
+    
+    def __init__(self, model: str = None, host: str = None, timeout: float = None, stream: bool = OLLAMA_STREAM):
+        self.model = model or OLLAMA_MODEL
+        self.host = host or OLLAMA_HOST
+        self.timeout = OLLAMA_TIMEOUT if timeout is None else timeout
+        self.stream = stream
+        self.keep_alive = OLLAMA_KEEP_ALIVE
+        self.history = []
+        self._prompt = (None, "", {}, None)  # (registry version, prompt, token -> function, verdict)
+        self._client = None
         
-        messages = [
+        self.in_flight = 0
+        self.requests = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.early_stops = 0
+        self.pings = 0
+        self.last_request = time.monotonic()
+        self.last_ttft = None
+
+    @property
+    def client(self) -> ollama.AsyncClient:
+        """Shared async client, created on first use (connections are reused across calls)."""
+        if self._client is None:
+            self._client = ollama.AsyncClient(
+                host=self.host,
+                timeout=httpx.Timeout(self.timeout, connect=OLLAMA_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=OLLAMA_MAX_CONNECTIONS,
+                    max_keepalive_connections=OLLAMA_MAX_CONNECTIONS
+                )
+            )
+        return self._client
+
+    async def close(self):
+        """Close pooled connections (shutdown)."""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.close()
+
+    async def request(self, messages: list, stop_when=None, timeout: float = None, **options) -> str:
+        """
+        One chat request with a hard timeout; returns the message content.
+        With stop_when(text) -> bool the response is streamed and the request is
+        closed as soon as it returns True (Ollama stops generating on disconnect).
+        Cancelling the caller (e.g. its WebSocket closed) aborts the HTTP request too.
+        """
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            return await self._send(messages, stop_when, timeout, options, measure=True)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            metrics.llm_request.observe(time.perf_counter() - start)
+
+    async def _send(self, messages: list, stop_when, timeout: float | None, options: dict,
+                    measure: bool = False) -> str:
+        """The HTTP call itself: in-flight count and hard timeout (time to first token if measure)."""
+        self.in_flight += 1
+        try:
+            if stop_when is None:
+                start = time.perf_counter()
+                response = await asyncio.wait_for(
+                    self.client.chat(model=self.model, messages=messages, options=options, keep_alive=self.keep_alive),
+                    timeout or self.timeout
+                )
+                load_sec = (response.get('load_duration') or 0) / 1e9
+                if load_sec > 1:
+                    logger.warning(f"🥶 LLM cold start: model load took {load_sec:.1f}s")
+                # Whole answer at once: wall time minus Ollama's generation after the first token
+                count, eval_ns = response.get('eval_count'), response.get('eval_duration')
+                if measure and count and eval_ns:
+                    self._first_token(time.perf_counter() - start - eval_ns * (count - 1) / count / 1e9)
+                return response['message']['content']
+            return await asyncio.wait_for(self._stream(messages, stop_when, options, measure), timeout or self.timeout)
+        finally:
+            self.in_flight -= 1
+            self.last_request = time.monotonic()
+
+    def _first_token(self, seconds: float):
+        self.last_ttft = seconds
+        metrics.llm_first_token.observe(seconds)
+        logger.info(f"⏱️ LLM time to first token: {seconds * 1000:.0f} ms")
+
+    async def _stream(self, messages: list, stop_when, options: dict, measure: bool = False) -> str:
+        """Accumulate streamed chunks until stop_when(text) or the end of the response."""
+        start = time.perf_counter()
+        stream = await self.client.chat(model=self.model, messages=messages, options=options, stream=True,
+                                        keep_alive=self.keep_alive)
+        text = ""
+        try:
+            async for chunk in stream:
+                if measure and not text and chunk['message']['content']:
+                    self._first_token(time.perf_counter() - start)
+                text += chunk['message']['content']
+                if chunk.get('done'):
+                    break
+                if stop_when(text):
+                    self.early_stops += 1
+                    metrics.llm_early_stop.inc()
+                    break
+        finally:
+            # Closes the HTTP response -> generation of the remaining tokens is aborted
+            await stream.aclose()
+        return text
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "stream": self.stream,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "early_stops": self.early_stops,
+            "pings": self.pings,
+            "last_ttft_ms": round(self.last_ttft * 1000, 1) if self.last_ttft is not None else None,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+        }
+
+    def _vocabulary(self) -> tuple:
+        """(version, prompt, token -> function, verdict), rebuilt after an intents reload."""
+        if self._prompt[0] != registry.version:
+            commands = llm_commands()
+            allowed = "\n".join(f"{phrase} → {token}" for phrase, token, _ in commands)
+            mapping = {token: func for _, token, func in commands}
+            self._prompt = (
+                registry.version,
+                COMMAND_FILTER_PROMPT.format(allowed=allowed),
+                mapping,
+                _Verdict(set(mapping) | {IGNORE})
+            )
+        return self._prompt
+
+    @property
+    def system_prompt(self) -> str:
+        """Command filter prompt built from the intent registry (rebuilt after a reload)."""
+        return self._vocabulary()[1]
+
+    def _messages(self, user_input: str) -> list:
+        """
+        Constant system message first, user text last - every request shares the
+        same prompt prefix, so Ollama reuses its cached KV state for it.
+        """
+        return [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": user_input}
         ]
+
+    async def warmup(self, timeout: float = OLLAMA_WARMUP_TIMEOUT) -> float:
+        """
+        Load the model and prime the system prompt prefix (1 generated token).
+        Kept out of the request counters / jarvis_llm_request_seconds, which
+        describe real classifications only.
+        """
+        start = time.perf_counter()
+        try:
+            await self._send(self._messages(WARMUP_INPUT), None, timeout, {"temperature": 0.0, "num_predict": 1})
+        finally:
+            metrics.llm_warmup.observe(time.perf_counter() - start)
+        elapsed = time.perf_counter() - start
+        logger.info(f"🔥 LLM warm ({self.model}): {elapsed * 1000:.0f} ms")
+        return elapsed
+
+    async def keep_warm(self, active=None, interval: float = OLLAMA_PING_INTERVAL):
+        """
+        Ping after `interval` seconds without an LLM request, but only while
+        active() says a session is going on (e.g. web clients connected).
+        """
+        if interval <= 0:
+            return
+        while True:
+            idle = time.monotonic() - self.last_request
+            if idle < interval:
+                await asyncio.sleep(interval - idle)
+                continue
+            if active is not None and not active():
+                await asyncio.sleep(interval)
+                continue
+            try:
+                await self.warmup(timeout=self.timeout)
+                self.pings += 1
+            except Exception as e:
+                logger.warning(f"LLM keep-warm ping failed: {e!r}")
+                await asyncio.sleep(interval)
+
+    async def classify(self, user_input: str) -> tuple[str, str | None]:
+        """
+        Command filter verdict: (raw output, function) - function is None for IGNORE.
+        Raises on timeout / connection errors (so callers don't cache failures).
+        """
+        _, _, mapping, verdict = self._vocabulary()
+        content = await self.request(self._messages(user_input), stop_when=verdict.ready if self.stream else None, temperature=0.0)
+        content = (strip_reasoning(content) or "").strip()
         
+        # Map simple text output to functions (from the intent registry)
+        # Note: 'เล่น' -> 'play' maps to resume_music (no song name allowed per prompt rules)
+        return content, mapping.get(content)
+
+    async def chat(self, user_input: str) -> dict:
+        """Chat with LLM and return command."""
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=messages,
-                options={"temperature": 0.0}
-            )
-            
-            content = response['message']['content'].strip()
-            
-            # Map simple text output to functions
-            mapping = {
-                "play": "resume_music",  # 'เล่น' map to resume contextually or play if modified
-                "pause": "pause_music",
-                "resume": "resume_music",
-                "skip": "skip_music",
-                "join": "join",
-                "leave": "leave",
-                "volume_up": "volume_up",     # Need to implement
-                "volume_down": "volume_down", # Need to implement
-                "clear": "clear_queue",
-                "queue": "show_queue",
-                "loop_on": "loop_on",
-                "loop_off": "loop_off",
-                "status": "show_status",
-                "IGNORE": None
-            }
-            
-            # Special case for 'play' which might need logic, but for now map strictly
-            # Note: The prompt maps 'เล่น' -> 'play'
-            if content == "play":
-                 # 'เล่น' in this strict context usually means resume or play (but no args allowed per prompt rules)
-                 # So we map it to resume_music for now, or could map to a generic play
-                 func_name = "resume_music" 
-            elif content in mapping:
-                func_name = mapping[content]
-            else:
-                func_name = None
+            content, func_name = await self.classify(user_input)
                 
             if func_name:
                 return {
@@ -110,17 +312,26 @@ Output: IGNORE
                     "response": "คำสั่งไม่ถูกต้อง (IGNORE)"
                 }
                 
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            logger.warning(f"⏱️ Ollama timeout after {self.timeout:g}s")
+            return {"function": None, "args": {}, "response": "Error"}
         except Exception as e:
             logger.error(f"Ollama error: {e}")
             return {"function": None, "args": {}, "response": "Error"}
 
 
 async def process_command(text: str, llm: LLM = None) -> dict:
-    """Process text command through LLM."""
-    if llm is None:
-        llm = LLM()
-    return await llm.chat(text)
+    """
+    Process text command: rules first, LLM only on a miss (brain.resolver).
+    Passing llm forces a direct LLM call with that instance.
+    """
+    if llm is not None:
+        return await llm.chat(text)
+    from .resolver import resolver
+    result = await resolver.resolve(text)
+    return result or {"function": None, "args": {}, "response": "คำสั่งไม่ถูกต้อง (IGNORE)"}
 
 
 # Global instance
 llm = LLM()
+metrics.llm_in_flight.func = lambda: llm.in_flight
@@ -0,0 +1,111 @@
+"""
+Resolver - Tiered intent resolution
+  1. rules : match_command_simple (exact / pattern / fuzzy, microseconds)
+  2. cache : earlier LLM verdicts (IGNORE included), LRU keyed by normalized text
+  3. llm   : Ollama command filter - only for text the rules missed
+"""
+import logging
+from collections import OrderedDict
+
+from config import LLM_FALLBACK, RESOLVER_CACHE_SIZE
+from core.commands import registry, match_command_simple, intent_response
+from core.readiness import readiness
+from core import metrics, tracing
+from .llm import LLM, llm as shared_llm
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("rules", "cache", "llm", "none")
+
+
+class Resolver:
+    """Rules -> cached LLM verdict -> LLM, with per-tier hit counts."""
+
+    def __init__(self, llm: LLM = None, cache_size: int = RESOLVER_CACHE_SIZE, llm_enabled: bool = LLM_FALLBACK):
+        self.llm = llm or shared_llm
+        self.cache_size = cache_size
+        self.llm_enabled = llm_enabled
+        self._cache = OrderedDict()  # normalized text -> function (None = IGNORE)
+        self._cache_version = registry.version
+
+        self.requests = 0
+        self.tiers = dict.fromkeys(TIERS, 0)
+        self.ignored = 0
+        self.llm_errors = 0
+
+    def llm_available(self) -> bool:
+        """Skip the LLM tier while Ollama is down / still being probed."""
+        return self.llm_enabled and readiness.is_ready("llm")
+
+    async def resolve(self, text: str) -> dict | None:
+        """Matched command dict (same shape as match_command_simple) or None."""
+        self.requests += 1
+        result = match_command_simple(text)
+        if result:
+            return self._hit("rules", result)
+        if not self.llm_available():
+            return self._hit("none", None)
+
+        key = " ".join(registry.normalize(text).split())
+        if not key:
+            return self._hit("none", None)
+
+        # Verdicts were made against the old command list
+        if self._cache_version != registry.version:
+            self._cache.clear()
+            self._cache_version = registry.version
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._hit("cache", self._result(self._cache[key]))
+
+        try:
+            with tracing.span("llm"):
+                content, func = await self.llm.classify(text)
+        except Exception as e:
+            # Timeouts / connection errors are not verdicts - don't cache them
+            self.llm_errors += 1
+            logger.warning(f"LLM fallback failed: {e!r}")
+            return self._hit("none", None)
+
+        logger.info(f"🧠 LLM verdict: {text} -> {content}")
+        self._cache[key] = func
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return self._hit("llm", self._result(func))
+
+    def _result(self, func: str | None) -> dict | None:
+        if func is None:
+            self.ignored += 1
+            return None
+        return {
+            "function": func,
+            "args": {},
+            "response": intent_response(func) or "รับทราบครับ",
+            "confidence": 1.0
+        }
+
+    def _hit(self, tier: str, result: dict | None) -> dict | None:
+        self.tiers[tier] += 1
+        metrics.intent_resolve.labels(tier).inc()
+        return result
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        total = self.requests or 1
+        return {
+            "requests": self.requests,
+            "tiers": dict(self.tiers),
+            "hit_rates": {tier: round(n / total, 4) for tier, n in self.tiers.items()},
+            "ignored": self.ignored,
+            "llm_errors": self.llm_errors,
+            "llm_enabled": self.llm_available(),
+            "cache_size": len(self._cache),
+            "cache_max": self.cache_size,
+        }
+
+
+# Global instance
+resolver = Resolver()
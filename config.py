@@ -37,9 +37,78 @@ WEB_PORT = int(os.getenv("WEB_PORT", "8080"))
 # STT (Whisper)
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small")
 WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+WHISPER_QUANTIZE = os.getenv("WHISPER_QUANTIZE", "none").lower()  # "int8" = dynamic quantization (CPU)
+
+# Cascade: decode with a fast model first, escalate to WHISPER_MODEL on low confidence
+STT_CASCADE = os.getenv("STT_CASCADE", "false").lower() == "true"
+WHISPER_FAST_MODEL = os.getenv("WHISPER_FAST_MODEL", "tiny")
+STT_CASCADE_MIN_LOGPROB = float(os.getenv("STT_CASCADE_MIN_LOGPROB", "-0.5"))  # avg log-prob to accept
+STT_CASCADE_MAX_NO_SPEECH = float(os.getenv("STT_CASCADE_MAX_NO_SPEECH", "0.5"))  # no-speech prob to accept
+
+# Streaming STT - partial transcriptions while the user is still talking
+STREAM_PARTIAL_INTERVAL = float(os.getenv("STREAM_PARTIAL_INTERVAL", "0.3"))  # seconds of new audio per partial
+STREAM_WINDOW_SEC = float(os.getenv("STREAM_WINDOW_SEC", "30"))  # rolling PCM buffer (Whisper window)
+STREAM_MAX_SEC = float(os.getenv("STREAM_MAX_SEC", "120"))  # whole utterance kept for the final decode
+
+# Binary audio upload frames (/ws/voice)
+AUDIO_BUFFER_BYTES = int(os.getenv("AUDIO_BUFFER_BYTES", str(256 * 1024)))  # preallocated per connection
+AUDIO_MAX_UPLOAD_BYTES = int(os.getenv("AUDIO_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))  # per utterance
+
+# STT micro-batching - decode concurrent clients together
+STT_BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "4"))
+STT_BATCH_WAIT_MS = float(os.getenv("STT_BATCH_WAIT_MS", "30"))  # max wait to fill a batch
+
+# STT worker pool - separate from the default executor (yt-dlp)
+STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))  # each worker loads its own model
+STT_WORKER_MODE = os.getenv("STT_WORKER_MODE", "thread")  # "thread" or "process" (no GIL contention)
+STT_IO_THREADS = int(os.getenv("STT_IO_THREADS", "2"))  # ffmpeg decode / stream pipes
+STT_QUEUE_SIZE = int(os.getenv("STT_QUEUE_SIZE", "8"))  # max pending clips before "busy"
+
+# Constrained decoding over the command vocabulary
+# "off" | "bias" (boost command tokens) | "restrict" (only command tokens until a play prefix)
+STT_CONSTRAINED = os.getenv("STT_CONSTRAINED", "off").lower()
+STT_CONSTRAINED_BIAS = float(os.getenv("STT_CONSTRAINED_BIAS", "5.0"))  # logit boost in "bias" mode
+
+# WebSocket fan-out - per-client outbound queue, slow clients are dropped
+WS_SEND_QUEUE = int(os.getenv("WS_SEND_QUEUE", "64"))  # messages buffered per client
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5.0"))  # seconds a single send may stall
+
+# Request tracing - recent traces kept for GET /api/debug/traces
+TRACE_BUFFER = int(os.getenv("TRACE_BUFFER", "500"))
+
+# Web -> Discord command queue: bursts of volume / play / pause commands are coalesced
+COMMAND_DEBOUNCE_MS = float(os.getenv("COMMAND_DEBOUNCE_MS", "150"))  # hold coalescable commands this long
+COMMAND_DEBOUNCE_MAX_MS = float(os.getenv("COMMAND_DEBOUNCE_MAX_MS", "600"))  # never hold longer than this
+VOLUME_STEP = int(os.getenv("VOLUME_STEP", "20"))  # volume_up / volume_down step (%)
+
+# Intent registry - command vocabulary, hot-reloaded when the file changes
+INTENTS_FILE = os.getenv("INTENTS_FILE", str(BASE_DIR / "intents.json"))
+INTENTS_RELOAD_INTERVAL = float(os.getenv("INTENTS_RELOAD_INTERVAL", "2.0"))  # seconds between mtime checks, 0 disables
+
+# Fuzzy command matching - tolerate small transcription errors (dropped/added vowel or tone mark)
+FUZZY_MAX_DISTANCE = int(os.getenv("FUZZY_MAX_DISTANCE", "2"))  # max edits, 0 disables
+FUZZY_MIN_CONFIDENCE = float(os.getenv("FUZZY_MIN_CONFIDENCE", "0.8"))  # 1 - edits / phrase length
+
+# VAD - skip Whisper on silent clips
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-45"))  # dBFS, minimum speech energy
+VAD_MIN_SPEECH_SEC = float(os.getenv("VAD_MIN_SPEECH_SEC", "0.15"))
 
 # LLM (Ollama)
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "deepseek-r1:8b")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "30"))  # Hard limit per request (seconds)
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "3"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "4"))  # Keep-alive pool size
+OLLAMA_STREAM = os.getenv("OLLAMA_STREAM", "true").lower() == "true"  # Stop at the first complete command token
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # How long Ollama keeps the model loaded after a request
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv("OLLAMA_WARMUP_TIMEOUT", "120"))  # Cold load of the model at startup
+OLLAMA_PING_INTERVAL = float(os.getenv("OLLAMA_PING_INTERVAL", "240"))  # Keep-warm ping while clients are connected (0 = off)
+OLLAMA_REPROBE_INTERVAL = float(os.getenv("OLLAMA_REPROBE_INTERVAL", "30"))  # Retry while Ollama is down (0 = probe once)
+
+# Intent resolution - rules first, LLM only for text the rules miss
+LLM_FALLBACK = os.getenv("LLM_FALLBACK", "true").lower() == "true"
+RESOLVER_CACHE_SIZE = int(os.getenv("RESOLVER_CACHE_SIZE", "512"))  # LLM verdicts kept (LRU)
 
 # TTS
 TTS_VOICE = os.getenv("TTS_VOICE", "th-TH-NiwatNeural")
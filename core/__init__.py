@@ -0,0 +1 @@
+"""Core module - Intent registry, metrics, tracing and state shared by every part"""
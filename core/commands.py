@@ -0,0 +1,382 @@
+"""
+Commands - Voice command vocabulary and matcher
+Shared by the web server, the STT decoder and the LLM prompt
+Vocabulary lives in intents.json (INTENTS_FILE) and is hot-reloaded on change
+"""
+import os
+import re
+import json
+import asyncio
+import logging
+import threading
+
+from config import FUZZY_MAX_DISTANCE, FUZZY_MIN_CONFIDENCE, INTENTS_FILE, INTENTS_RELOAD_INTERVAL
+from core.fuzzy import DeletionIndex
+
+logger = logging.getLogger(__name__)
+
+_DIGITS = re.compile(r'\d+')
+
+
+def validate_spec(spec: dict):
+    """Raise ValueError if the registry is inconsistent (bad file never replaces a good one)."""
+    functions = spec.get("functions")
+    if not isinstance(functions, dict) or not functions:
+        raise ValueError("'functions' must be a non-empty object")
+
+    def check(entry: dict, where: str, arg: str = None):
+        func = entry.get("function")
+        if func not in functions:
+            raise ValueError(f"{where}: unknown function {func!r}")
+        if not isinstance(entry.get("response"), str):
+            raise ValueError(f"{where}: missing response")
+        params = functions[func].get("parameters", {})
+        for name in list(entry.get("args", {})) + ([arg] if arg else []):
+            if name not in params:
+                raise ValueError(f"{where}: {func} has no parameter {name!r}")
+
+    for section in ("intents", "legacy"):
+        for i, entry in enumerate(spec.get(section, [])):
+            if not entry.get("keywords"):
+                raise ValueError(f"{section}[{i}]: no keywords")
+            check(entry, f"{section}[{i}]")
+
+    for i, words in enumerate(spec.get("antonyms", [])):
+        if not isinstance(words, list) or len(words) < 2 or not all(isinstance(w, str) and w for w in words):
+            raise ValueError(f"antonyms[{i}]: need two or more words")
+
+    for name in ("volume", "play"):
+        pattern = spec.get("patterns", {}).get(name)
+        if not pattern or not pattern.get("prefixes"):
+            raise ValueError(f"patterns.{name}: no prefixes")
+        check(pattern, f"patterns.{name}", pattern.get("arg"))
+        if "bare" in pattern:
+            check(pattern["bare"], f"patterns.{name}.bare")
+
+
+def load_spec(path: str) -> dict:
+    """Read and validate an intent registry file."""
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    validate_spec(spec)
+    return spec
+
+
+def _trie_insert(root: dict, word: str, value):
+    node = root
+    for ch in word:
+        node = node.setdefault(ch, {})
+    node.setdefault("", value)  # "" never collides with a character key
+
+
+class IntentIndex:
+    """
+    Compiled matcher: hash map for exact phrases, character tries for
+    "play + song" and volume prefixes. Built once, O(len(text)) per match.
+    Falls back to an edit-distance lookup (deletion index) over the exact phrases.
+    """
+
+    def __init__(self, spec: dict, max_distance: int = 0, min_confidence: float = 1.0):
+        play = spec["patterns"]["play"]
+        volume = spec["patterns"]["volume"]
+
+        # Exact intents in priority order (first entry containing a phrase wins),
+        # then the play prefix alone (without song name -> Resume/Default action)
+        self.exact = {}
+        entries = list(spec.get("intents", []))
+        if "bare" in play:
+            entries.append(dict(play["bare"], keywords=play["prefixes"]))
+        for entry in entries:
+            for keyword in entry["keywords"]:
+                self.exact.setdefault(keyword, (entry["function"], entry.get("args", {}), entry["response"]))
+
+        self.play_pattern = (play["function"], play["arg"], play["response"])
+        self.play = {}
+        for priority, prefix in enumerate(play["prefixes"]):
+            _trie_insert(self.play, prefix, priority)
+
+        self.volume_pattern = (volume["function"], volume["arg"], volume["response"])
+        self.volume = {}
+        for prefix in volume["prefixes"]:
+            _trie_insert(self.volume, prefix, True)
+
+        # Legacy phrases are checked after "play + song", so one that starts
+        # with a play prefix is matched as a song (e.g. "เปิดวนซ้ำ")
+        for entry in spec.get("legacy", []):
+            for phrase in entry["keywords"]:
+                if phrase not in self.exact and self._play_song(phrase) is None:
+                    self.exact[phrase] = (entry["function"], entry.get("args", {}), entry["response"])
+
+        words = sorted(spec.get("noise_words", []), key=len, reverse=True)
+        self.noise = re.compile("|".join(re.escape(w) for w in words)) if words else None
+
+        # Words a one-vowel edit flips ("ปิด" inside "เปิด"): longest first,
+        # so each position is read as the whole word
+        words = sorted({w for pair in spec.get("antonyms", []) for w in pair}, key=len, reverse=True)
+        self.polarity = re.compile("|".join(re.escape(w) for w in words)) if words else None
+
+        self.max_distance = max_distance
+        self.min_confidence = min_confidence
+        self.fuzzy = DeletionIndex(self.exact, max_distance) if max_distance > 0 else None
+
+        # Phrases a longer utterance can still turn into another command:
+        # they start a play / volume pattern ("เอาเพลง" -> "เอาเพลงหน้า") or
+        # are the beginning of a phrase for a different function
+        # ("เปลี่ยน" -> "เปลี่ยนห้อง"). Never fired from a partial transcription.
+        patterns = [(p, self.play_pattern[0]) for p in play["prefixes"]]
+        patterns += [(p, self.volume_pattern[0]) for p in volume["prefixes"]]
+        phrases = [(p, hit[0]) for p, hit in self.exact.items()] + patterns
+        self.ambiguous = set()
+        for phrase, (func, _, _) in self.exact.items():
+            if any(phrase.startswith(prefix) for prefix, _ in patterns) or any(
+                other != phrase and other.startswith(phrase) and other_func != func
+                for other, other_func in phrases
+            ):
+                self.ambiguous.add(phrase)
+
+    def _has_prefix(self, root: dict, cmd: str) -> bool:
+        node = root
+        for ch in cmd:
+            node = node.get(ch)
+            if node is None:
+                return False
+            if "" in node:
+                return True
+        return False
+
+    def _play_song(self, cmd: str) -> str | None:
+        """Song name after the highest-priority play prefix, if any."""
+        best = None
+        node = self.play
+        for i, ch in enumerate(cmd):
+            node = node.get(ch)
+            if node is None:
+                break
+            priority = node.get("")
+            if priority is not None and (best is None or priority < best[0]):
+                # Check if there is actual content after the keyword
+                song = cmd[i + 1:].strip()
+                if song:
+                    best = (priority, song)
+        return best[1] if best else None
+
+    def _senses(self, text: str) -> frozenset:
+        """Antonym words in text."""
+        return frozenset(self.polarity.findall(text)) if self.polarity else frozenset()
+
+    def _fuzzy(self, cmd: str) -> tuple[str, float] | None:
+        """Closest exact phrase and its confidence, None if too far or ambiguous."""
+        if not self.fuzzy or not cmd:
+            return None
+        # More edits than min_confidence allows for this length can't match anyway:
+        # d <= (1 - c) * max(n, n + d)  ->  d <= (1 - c) * n / c
+        max_distance = self.max_distance
+        if self.min_confidence > 0:
+            max_distance = min(max_distance, int((1 - self.min_confidence) * len(cmd) / self.min_confidence + 1e-9))
+        if max_distance <= 0:
+            return None
+        # Never rescue a phrase with extra words ("pauses", "เปลี่ยนเพลงที")
+        # or an edit that flips an antonym ("ปิดเพลง" is not "เปิดเพลง")
+        senses = self._senses(cmd)
+        candidates = [
+            (d, phrase) for d, phrase in self.fuzzy.search(cmd, max_distance)
+            if not cmd.startswith(phrase) and self._senses(phrase) == senses
+        ]
+        if not candidates:
+            return None
+        distance, phrase = candidates[0]
+        # Two different intents equally close -> don't guess
+        for d, other in candidates[1:]:
+            if d > distance:
+                break
+            if self.exact[other][0] != self.exact[phrase][0]:
+                return None
+        confidence = 1 - distance / max(len(cmd), len(phrase))
+        if confidence < self.min_confidence:
+            return None
+        return phrase, round(confidence, 3)
+
+    def normalize(self, text: str) -> str:
+        """Lowercase, polite particles / "bot" removed (what the rules see)."""
+        cmd = text.strip().lower()
+        if self.noise:
+            cmd = self.noise.sub("", cmd)
+        return cmd.strip()
+
+    def match(self, text: str, fuzzy: bool = True) -> dict | None:
+        # Preprocessing: Remove polite particles and "bot"
+        cmd = self.normalize(text)
+
+        # Pattern: Set Volume (e.g. "เสียง 50")
+        if self._has_prefix(self.volume, cmd):
+            match = _DIGITS.search(cmd)
+            if match:
+                func, arg, resp = self.volume_pattern
+                level = int(match.group())
+                return {
+                    "function": func, 
+                    "args": {arg: level}, 
+                    "response": resp.format(**{arg: level}),
+                    "confidence": 1.0
+                }
+
+        # Strict exact matches for simple commands (+ legacy utility commands)
+        hit = self.exact.get(cmd)
+        if hit:
+            func, args, resp = hit
+            return {"function": func, "args": dict(args), "response": resp, "confidence": 1.0}
+
+        # "Play [song]" pattern (Prefix matching)
+        song = self._play_song(cmd)
+        if song:
+            func, arg, resp = self.play_pattern
+            return {
+                "function": func, 
+                "args": {arg: song}, 
+                "response": resp.format(**{arg: song}),
+                "confidence": 1.0
+            }
+
+        # Near-miss of an exact phrase (e.g. Whisper dropped a tone mark)
+        near = self._fuzzy(cmd) if fuzzy else None
+        if near:
+            phrase, confidence = near
+            func, args, resp = self.exact[phrase]
+            return {"function": func, "args": dict(args), "response": resp, "confidence": confidence}
+
+        return None
+
+    def match_complete(self, text: str) -> dict | None:
+        """
+        Exact match that no longer utterance can change (early firing from
+        partials): no play / volume patterns, fuzzy hits or ambiguous phrases.
+        """
+        cmd = self.normalize(text)
+        hit = self.exact.get(cmd)
+        if hit is None or cmd in self.ambiguous:
+            return None
+        func, args, resp = hit
+        return {"function": func, "args": dict(args), "response": resp, "confidence": 1.0}
+
+
+class IntentRegistry:
+    """
+    Loads the intent registry file and compiles it into an IntentIndex.
+    A reload swaps (version, spec, index) in one assignment - in-flight
+    matches finish on the index they started with, nothing is locked.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.current = (0, None, None)  # (version, spec, index)
+        self.mtime = None
+        self._reload_lock = threading.Lock()  # one compile at a time
+
+    @property
+    def version(self) -> int:
+        return self.current[0]
+
+    @property
+    def spec(self) -> dict:
+        return self.current[1]
+
+    def load(self):
+        """Compile the file and swap it in (raises on an invalid file)."""
+        with self._reload_lock:
+            mtime = os.path.getmtime(self.path)
+            spec = load_spec(self.path)
+            index = IntentIndex(spec, max_distance=FUZZY_MAX_DISTANCE, min_confidence=FUZZY_MIN_CONFIDENCE)
+            self.mtime = mtime
+            self.current = (self.version + 1, spec, index)
+        logger.info(f"📖 Intents loaded: {len(index.exact)} phrases (v{self.version})")
+
+    def reload_if_changed(self) -> bool:
+        """Reload when the file changed; keep the old vocabulary if the new one is invalid."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            logger.error(f"Intent registry unavailable: {e}")
+            return False
+        if mtime == self.mtime:
+            return False
+        try:
+            self.load()
+            return True
+        except Exception as e:
+            # Don't retry the same broken file every interval
+            self.mtime = mtime
+            logger.error(f"❌ Intent registry reload failed, keeping v{self.version}: {e}")
+            return False
+
+    async def watch(self, interval: float = INTENTS_RELOAD_INTERVAL):
+        """Poll the file and recompile off the event loop."""
+        if interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.reload_if_changed)
+
+    def match(self, text: str, fuzzy: bool = True) -> dict | None:
+        return self.current[2].match(text, fuzzy)
+
+    def match_complete(self, text: str) -> dict | None:
+        return self.current[2].match_complete(text)
+
+    def normalize(self, text: str) -> str:
+        return self.current[2].normalize(text)
+
+
+def command_phrases() -> tuple[list[str], list[str]]:
+    """
+    All phrases the matcher accepts.
+    Returns (exact_commands, prefixes) - prefixes are followed by free text
+    (song name / volume level).
+    """
+    spec = registry.spec
+    exact = []
+    for entry in spec.get("intents", []) + spec.get("legacy", []):
+        exact.extend(entry["keywords"])
+    patterns = spec["patterns"]
+    prefixes = patterns["play"]["prefixes"] + patterns["volume"]["prefixes"]
+    return list(dict.fromkeys(exact)), list(dict.fromkeys(prefixes))
+
+
+def function_specs() -> dict:
+    """Callable functions with description and parameter schema."""
+    return registry.spec["functions"]
+
+
+def llm_commands() -> list[tuple[str, str, str]]:
+    """(phrase, token, function) for the LLM command filter prompt."""
+    spec = registry.spec
+    entries = spec.get("intents", []) + spec.get("legacy", [])
+    play = spec["patterns"]["play"]
+    if "bare" in play:
+        entries = [dict(play["bare"], keywords=play["prefixes"])] + entries
+    return [(e["keywords"][0], e["llm"], e["function"]) for e in entries if e.get("llm")]
+
+
+def intent_response(function: str) -> str | None:
+    """Response of the first argument-less intent calling function (LLM verdicts)."""
+    spec = registry.spec
+    entries = spec.get("intents", []) + spec.get("legacy", [])
+    bare = spec["patterns"]["play"].get("bare")
+    if bare:
+        entries = [bare] + entries
+    for entry in entries:
+        if entry["function"] == function:
+            return entry["response"]
+    return None
+
+
+# Global instance
+registry = IntentRegistry(INTENTS_FILE)
+registry.load()
+
+
+def match_command_simple(text: str) -> dict | None:
+    """
+    Match voice commands to intents using the current compiled intent index.
+    Result includes "confidence" (1.0 for exact, lower for fuzzy matches).
+    """
+    return registry.match(text)
@@ -0,0 +1,98 @@
+"""
+Fuzzy - Edit-distance lookup over the command vocabulary
+Deletion-neighbourhood index: Whisper often adds/drops a Thai vowel or tone mark (one code point)
+"""
+
+
+def _pattern(a: str) -> tuple[dict, int, int]:
+    """Per-character match bitmasks of a (reused across comparisons)."""
+    peq = {}
+    for i, ch in enumerate(a):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    return peq, len(a), (1 << len(a)) - 1
+
+
+def _distance(pattern: tuple[dict, int, int], b: str) -> int:
+    """Bit-parallel edit distance (Myers / Hyyrö) between a compiled pattern and b."""
+    peq, m, mask = pattern
+    if not m:
+        return len(b)
+    last = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for ch in b:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance per code point (Thai vowels / tone marks count as one edit)."""
+    return _distance(_pattern(a), b)
+
+
+def deletions(word: str, k: int) -> set[str]:
+    """word and every string made from it by deleting up to k characters."""
+    out = {word}
+    frontier = [(word, 0)]
+    for _ in range(k):
+        # Positions never go backwards -> each combination of deletions is built once
+        frontier = [(w[:i] + w[i + 1:], i) for w, start in frontier for i in range(start, len(w))]
+        out.update(w for w, _ in frontier)
+    return out
+
+
+class DeletionIndex:
+    """
+    Symmetric-delete index (SymSpell): two strings within edit distance k share
+    a string reachable by at most k deletions from each, so a lookup is a few
+    hash probes plus exact distances for the handful of candidates found -
+    instead of comparing against most of the vocabulary.
+    """
+
+    def __init__(self, words=(), max_distance: int = 2):
+        self.max_distance = max_distance
+        self.index = {}  # deletion variant -> words it came from
+        self.lengths = set()
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        if word in self.index.get(word, ()):
+            return  # Already indexed
+        self.size += 1
+        self.lengths.add(len(word))
+        for variant in deletions(word, self.max_distance):
+            self.index.setdefault(variant, set()).add(word)
+
+    def search(self, word: str, max_distance: int) -> list[tuple[int, str]]:
+        """All (distance, word) within max_distance (<= the index's), closest first."""
+        k = min(max_distance, self.max_distance)
+        n = len(word)
+        # Nothing of a reachable length -> no deletion variants to probe
+        if not any(abs(n - length) <= k for length in self.lengths):
+            return []
+        candidates = set()
+        for variant in deletions(word, k):
+            words = self.index.get(variant)
+            if words:
+                candidates |= words
+        pattern = _pattern(word)
+        found = []
+        for candidate in candidates:
+            d = _distance(pattern, candidate)
+            if d <= k:
+                found.append((d, candidate))
+        found.sort()
+        return found
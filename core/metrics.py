@@ -0,0 +1,190 @@
+"""
+Metrics - Prometheus text exposition for /metrics
+Counters and fixed-bucket histograms; observe() only bumps preallocated slots
+(no prometheus_client dependency, no per-call allocation beyond int increments)
+"""
+import math
+import threading
+from bisect import bisect_left
+
+# Latency buckets (seconds) - STT / yt-dlp / TTS all live in 10 ms .. 30 s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Child for one label combination (created once, cached)."""
+        if len(values) != len(self.labelnames) or not values:
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        key = values[0] if len(values) == 1 else values
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _series(self):
+        """(label values, child) pairs."""
+        if not self.labelnames:
+            return [((), self)]
+        return [((k,) if len(self.labelnames) == 1 else k, c) for k, c in list(self._children.items())]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._series():
+            lines.extend(child._render(self.name, self.labelnames, values))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        super().__init__(name, help, labelnames)
+        self.value = 0
+
+    def _new_child(self):
+        return Counter(self.name, self.help)
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def _render(self, name, labelnames, values):
+        return [f"{name}{_labels(labelnames, values)} {_fmt(self.value)}"]
+
+
+class Gauge(_Metric):
+    """Value read at scrape time from a callback (queue depths etc.)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, func=None):
+        super().__init__(name, help)
+        self.func = func
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def _render(self, name, labelnames, values):
+        value = self.func() if self.func else self.value
+        return [f"{name}{_labels(labelnames, values)} {_fmt(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def _render(self, name, labelnames, values):
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += n
+            le = f'le="{_fmt(bound)}"'
+            lines.append(f"{name}_bucket{_labels(labelnames, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labelnames, values)} {_fmt(self.sum)}")
+        lines.append(f"{name}_count{_labels(labelnames, values)} {self.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics.setdefault(metric.name, metric)
+        return self.metrics[metric.name]
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, func=None) -> Gauge:
+        return self.register(Gauge(name, help, func))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global instance
+registry = Registry()
+
+# --- Jarvis metrics ---
+# Web ingress
+audio_bytes = registry.counter("jarvis_audio_bytes_received_total", "Audio bytes received on /ws/voice")
+audio_upload_bytes = registry.histogram("jarvis_audio_upload_bytes", "Size of one uploaded utterance", buckets=BYTES_BUCKETS)
+command_match = registry.counter("jarvis_command_match_total", "Matched commands by intent (intent=\"none\" = miss)", ("intent",))
+command_fuzzy = registry.counter("jarvis_command_fuzzy_total", "Commands matched by the fuzzy fallback")
+ws_evicted = registry.counter("jarvis_ws_clients_evicted_total", "Slow web clients dropped (queue_full / send_timeout)", ("reason",))
+
+# STT
+stt_queue_wait = registry.histogram("jarvis_stt_queue_wait_seconds", "Time a clip waits for a batch slot")
+stt_batch_decode = registry.histogram("jarvis_stt_batch_decode_seconds", "Whisper decode time per batch (scheduler view)")
+stt_audio_decode = registry.histogram("jarvis_stt_audio_decode_seconds", "ffmpeg container decode + resample")
+stt_inference = registry.histogram("jarvis_stt_inference_seconds", "Whisper mel + decode per batch (in-process workers)")
+stt_cascade = registry.counter("jarvis_stt_cascade_total", "Cascade clips: accepted from the fast model / escalated to the large one (in-process workers)", ("result",))
+
+# Command queue
+command_dwell = registry.histogram("jarvis_command_queue_dwell_seconds", "Time a command spends in command_queue")
+command_queue_depth = registry.gauge("jarvis_command_queue_depth", "Commands waiting for the Discord bot")
+
+# Discord / music / TTS
+ytdlp_extract = registry.histogram("jarvis_ytdlp_extract_seconds", "yt-dlp search + stream URL extraction")
+tts_synthesis = registry.histogram("jarvis_tts_synthesis_seconds", "Edge-TTS synthesis")
+tts_playback = registry.histogram("jarvis_tts_playback_seconds", "TTS playback in the voice channel")
+voice_connect = registry.histogram("jarvis_discord_voice_connect_seconds", "Discord voice channel connect / move")
+
+# LLM (Ollama)
+llm_request = registry.histogram("jarvis_llm_request_seconds", "Ollama chat request (completed, timed out or cancelled)")
+llm_in_flight = registry.gauge("jarvis_llm_in_flight", "Ollama requests currently in flight")
+llm_warmup = registry.histogram("jarvis_llm_warmup_seconds", "Ollama warmup / keep-warm pings (not counted as requests)")
+llm_first_token = registry.histogram("jarvis_llm_first_token_seconds", "Time to the first token, streamed or not (cold loads show up here)")
+llm_early_stop = registry.counter("jarvis_llm_early_stop_total", "Streamed Ollama responses cut off once the verdict was known")
+intent_resolve = registry.counter("jarvis_intent_resolve_total", "Intent resolutions by tier (rules / cache / llm / none)", ("tier",))
@@ -0,0 +1,58 @@
+"""
+Readiness - Per-component load state (Whisper, LLM) for /api/ready
+Models load in the background while the server already accepts connections
+"""
+import time
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class Readiness:
+    """Tracks load state and load time of each component."""
+
+    def __init__(self):
+        self.components = {}
+
+    def register(self, name: str):
+        self.components.setdefault(name, {"state": PENDING, "load_sec": None, "error": None, "_start": None})
+
+    def loading(self, name: str):
+        self.register(name)
+        self.components[name].update(state=LOADING, error=None, _start=time.monotonic())
+
+    def ready(self, name: str):
+        self._finish(name, READY)
+
+    def failed(self, name: str, error: Exception | str):
+        self._finish(name, FAILED, str(error))
+
+    def _finish(self, name: str, state: str, error: str = None):
+        self.register(name)
+        c = self.components[name]
+        start = c["_start"]
+        c.update(state=state, error=error, load_sec=round(time.monotonic() - start, 2) if start else None)
+
+    def is_ready(self, name: str) -> bool:
+        return self.components.get(name, {}).get("state") == READY
+
+    def is_loading(self, name: str) -> bool:
+        return self.components.get(name, {}).get("state") == LOADING
+
+    def all_ready(self) -> bool:
+        return bool(self.components) and all(c["state"] == READY for c in self.components.values())
+
+    def snapshot(self) -> dict:
+        """Public view (no internal timestamps)."""
+        return {
+            name: {k: v for k, v in c.items() if not k.startswith("_")}
+            for name, c in self.components.items()
+        }
+
+
+# Global instance
+readiness = Readiness()
+readiness.register("whisper")
+readiness.register("llm")
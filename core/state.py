@@ -0,0 +1,62 @@
+"""
+State - Versioned player / voice state pushed to web clients
+Discord bot and MusicPlayer publish changes; subscribers get diffs
+(clients get a snapshot + version on connect, then {"type": "state"} diffs)
+"""
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Single source of truth for what the bot is doing right now."""
+
+    def __init__(self):
+        self.state = {
+            "discord": False,       # Bot logged in
+            "voice": False,         # In a voice channel
+            "voice_channel": None,
+            "song": None,
+            "playing": False,
+            "paused": False,
+            "volume": 50,
+        }
+        self.version = 0
+        self._listeners = []
+        self._loop = None
+        self._thread = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Event loop that owns the state (updates from other threads hop onto it)."""
+        self._loop = loop
+        self._thread = threading.get_ident()
+
+    def subscribe(self, callback):
+        """callback(version, changes) on every change (runs on the event loop)."""
+        self._listeners.append(callback)
+
+    def update(self, **changes):
+        """Apply changes; publishes only keys whose value actually changed."""
+        if self._loop and threading.get_ident() != self._thread:
+            # e.g. discord.py player thread (after= callback)
+            self._loop.call_soon_threadsafe(lambda: self.update(**changes))
+            return
+        diff = {k: v for k, v in changes.items() if self.state.get(k) != v}
+        if not diff:
+            return
+        self.state.update(diff)
+        self.version += 1
+        for callback in self._listeners:
+            try:
+                callback(self.version, diff)
+            except Exception as e:
+                logger.error(f"State listener error: {e}")
+
+    def snapshot(self) -> dict:
+        return {"version": self.version, "state": dict(self.state)}
+
+
+# Global instance
+state = StateStore()
@@ -0,0 +1,157 @@
+"""
+Tracing - Correlation IDs and timed spans from push-to-talk to Discord action
+A trace starts at ingress (WebSocket utterance / text, /api/command), rides on
+the command_queue item and is finished by the Discord bot after executing.
+Recent traces: GET /api/debug/traces
+"""
+import time
+import uuid
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+from config import TRACE_BUFFER
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """One request: id, source, spans (ms offsets from start) and final status."""
+
+    def __init__(self, source: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []
+        self.marks = {"start": self.t0}
+        self.attrs = {}
+        self.status = "active"
+        self.duration_ms = None
+
+    def add_span(self, name: str, start: float, end: float, **attrs):
+        """Record a span from perf_counter() timestamps."""
+        span = {
+            "name": name,
+            "start_ms": round((start - self.t0) * 1000, 2),
+            "duration_ms": round((end - start) * 1000, 2),
+        }
+        if attrs:
+            span.update(attrs)
+        self.spans.append(span)
+
+    def mark(self, name: str):
+        """Remember a point in time (e.g. "queued") for a later span."""
+        self.marks[name] = time.perf_counter()
+
+    def span_since(self, mark: str, name: str, **attrs):
+        start = self.marks.get(mark)
+        if start is not None:
+            self.add_span(name, start, time.perf_counter(), **attrs)
+
+    def finish(self, status: str = "ok"):
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self.t0) * 1000, 2)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.id,
+            "source": self.source,
+            "started": self.started,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "attrs": self.attrs,
+            "spans": list(self.spans),
+        }
+
+
+class TraceStore:
+    """Ring buffer of recent traces (active ones included)."""
+
+    def __init__(self, size: int = TRACE_BUFFER):
+        self.traces = deque(maxlen=size)
+        self.by_id = {}
+
+    def add(self, trace: Trace):
+        if len(self.traces) == self.traces.maxlen:
+            self.by_id.pop(self.traces[0].id, None)
+        self.traces.append(trace)
+        self.by_id[trace.id] = trace
+
+    def get(self, trace_id: str) -> Trace | None:
+        return self.by_id.get(trace_id)
+
+    def recent(self, limit: int = 50, min_ms: float = 0, source: str = None) -> list[dict]:
+        """Newest first; min_ms filters finished traces by duration (p99 hunting)."""
+        out = []
+        for trace in reversed(self.traces):
+            if source and trace.source != source:
+                continue
+            if min_ms and (trace.duration_ms or 0) < min_ms:
+                continue
+            out.append(trace.to_dict())
+            if len(out) >= limit:
+                break
+        return out
+
+
+# Global instance
+store = TraceStore()
+
+
+def start(source: str, **attrs) -> Trace:
+    """New trace, made current for this task (and tasks it creates)."""
+    trace = Trace(source)
+    trace.attrs.update(attrs)
+    store.add(trace)
+    _current.set(trace)
+    return trace
+
+
+def activate(trace: Trace | None):
+    """Make an existing trace current (e.g. when the bot dequeues a command)."""
+    _current.set(trace)
+
+
+def current() -> Trace | None:
+    return _current.get()
+
+
+def current_id() -> str | None:
+    trace = _current.get()
+    return trace.id if trace else None
+
+
+def finish(trace: Trace | None, status: str = "ok"):
+    if trace is not None:
+        trace.finish(status)
+
+
+def record(name: str, start: float, end: float = None, **attrs):
+    """Record a span (perf_counter() timestamps) into the current trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(name, start, time.perf_counter() if end is None else end, **attrs)
+
+
+@contextmanager
+def span(name: str, trace: Trace = None, **attrs):
+    """Time a block into the given / current trace (no-op without one)."""
+    trace = trace or _current.get()
+    if trace is None:
+        yield None
+        return
+    start_time = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.add_span(name, start_time, time.perf_counter(), **attrs)
+
+
+class TraceLogFilter(logging.Filter):
+    """Adds %(trace_id)s to log records so lines of one request can be joined."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_id() or "-"
+        return True
@@ -1,4 +1,7 @@
 """Ear module - Speech-to-Text with Faster-Whisper"""
 from .transcriber import Transcriber
+from .stream import StreamingSession
+from .scheduler import TranscriptionScheduler, TranscriptionBusy
+from .pool import TranscriptionPool
 
-__all__ = ['Transcriber']
+__all__ = ['Transcriber', 'StreamingSession', 'TranscriptionScheduler', 'TranscriptionBusy', 'TranscriptionPool']
@@ -0,0 +1,151 @@
+"""
+Constrained decoding - Bias/restrict Whisper to the command vocabulary
+Token-prefix trie over the matcher's keywords, with early stop on a full command
+"""
+import dataclasses
+import logging
+import threading
+
+import torch
+from whisper.decoding import DecodingTask, LogitFilter, MaximumLikelihoodRanker
+
+from core.commands import command_phrases, registry
+
+logger = logging.getLogger(__name__)
+
+COMMAND = 1   # Complete command - nothing may follow
+PREFIX = 2    # Play / volume prefix - free text (song name, level) may follow
+
+_tries = {}  # (encoding, language, registry version) -> trie, current version only
+_tries_lock = threading.Lock()
+
+
+class _Node:
+    __slots__ = ("children", "end")
+
+    def __init__(self):
+        self.children = {}
+        self.end = 0
+
+
+def build_trie(tokenizer) -> _Node:
+    """Token-prefix trie of all command phrases."""
+    root = _Node()
+    exact, prefixes = command_phrases()
+    for phrases, kind in ((exact, COMMAND), (prefixes, PREFIX)):
+        for phrase in phrases:
+            # Whisper may emit the first word with or without a leading space / capital
+            for variant in {phrase, " " + phrase, phrase.capitalize(), " " + phrase.capitalize()}:
+                node = root
+                for token in tokenizer.encode(variant):
+                    node = node.children.setdefault(token, _Node())
+                node.end = max(node.end, kind)
+    return root
+
+
+def get_trie(tokenizer) -> _Node:
+    """Build the trie once per tokenizer and intent registry version."""
+    version = registry.version
+    key = id(tokenizer.encoding), tokenizer.language, version
+    trie = _tries.get(key)
+    if trie is None:
+        with _tries_lock:
+            # Tries of an older vocabulary are never used again
+            for stale in [k for k in _tries if k[2] != version]:
+                del _tries[stale]
+            trie = _tries.get(key)
+            if trie is None:
+                trie = _tries[key] = build_trie(tokenizer)
+                logger.info(f"🌳 Command token trie built (intents v{version})")
+    return trie
+
+
+class CommandFilter(LogitFilter):
+    """Restrict or bias next-token logits to continuations of a known command."""
+
+    def __init__(self, trie: _Node, sample_begin: int, eot: int, mode: str = "bias", bias: float = 5.0):
+        self.trie = trie
+        self.sample_begin = sample_begin
+        self.eot = eot
+        self.mode = mode
+        self.bias = bias
+
+    def _allowed(self, generated: list) -> list | None:
+        """Tokens allowed next, or None when decoding is unconstrained."""
+        node = self.trie
+        for token in generated:
+            child = node.children.get(token)
+            if child is None:
+                # Past a play prefix (song name) or off-vocabulary -> free decoding
+                return None
+            node = child
+        if node.end == PREFIX:
+            return None
+        allowed = list(node.children)
+        if node.end == COMMAND:
+            allowed.append(self.eot)
+        return allowed
+
+    def apply(self, logits: torch.Tensor, tokens: torch.Tensor):
+        for i in range(tokens.shape[0]):
+            generated = tokens[i, self.sample_begin:].tolist()
+            if generated and generated[-1] == self.eot:
+                continue
+            allowed = self._allowed(generated)
+            if allowed is None:
+                continue
+
+            if allowed == [self.eot]:
+                # Complete non-play command emitted -> stop early
+                logits[i, :] = -float("inf")
+                logits[i, self.eot] = 0
+            elif self.mode == "restrict":
+                mask = torch.full_like(logits[i], -float("inf"))
+                mask[allowed] = 0
+                if not generated:
+                    # Noise / other speech may end empty instead of becoming a command
+                    mask[self.eot] = 0
+                logits[i] += mask
+            else:
+                logits[i, allowed] += self.bias
+
+
+class EmptyTolerantRanker(MaximumLikelihoodRanker):
+    """Whisper's length-normalised ranking, counting an empty transcript as one token."""
+
+    def rank(self, tokens, sum_logprobs):
+        # Stock Whisper never ends at the first step (SuppressBlank) and divides by the length
+        def score(logprob, length):
+            length = max(length, 1)
+            if self.length_penalty is None:
+                return logprob / length
+            return logprob / ((5 + length) / 6) ** self.length_penalty
+
+        return [
+            max(range(len(group)), key=lambda j: score(logprobs[j], len(group[j])))
+            for group, logprobs in zip(tokens, sum_logprobs)
+        ]
+
+
+class CommandDecodingTask(DecodingTask):
+    """Whisper DecodingTask with the command filter appended."""
+
+    def __init__(self, model, options, mode: str = "bias", bias: float = 5.0):
+        restrict = mode == "restrict"
+        if restrict:
+            # SuppressBlank forces EOT to -inf at the first step, which would turn
+            # silence / noise into a command; the restrict mask already rules out blanks
+            options = dataclasses.replace(options, suppress_blank=False)
+        super().__init__(model, options)
+        if restrict:
+            self.sequence_ranker = EmptyTolerantRanker(options.length_penalty)
+        trie = get_trie(self.tokenizer)
+        self.logit_filters.append(
+            CommandFilter(trie, self.sample_begin, self.tokenizer.eot, mode=mode, bias=bias)
+        )
+
+
+@torch.no_grad()
+def decode_constrained(model, mel: torch.Tensor, options, mode: str = "bias", bias: float = 5.0) -> list:
+    """Batched decode biased/restricted to the command vocabulary."""
+    return CommandDecodingTask(model, options, mode=mode, bias=bias).run(mel)
@@ -0,0 +1,109 @@
+"""
+Pool - Dedicated STT worker pool (threads or processes)
+Keeps Whisper work off the default asyncio executor used by yt-dlp
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from config import STT_WORKERS, STT_WORKER_MODE, STT_IO_THREADS
+from core.commands import registry
+from .transcriber import Transcriber, transcriber
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_registry_version = None  # Parent's intent registry version this worker last synced to
+
+
+def _worker_transcriber() -> Transcriber:
+    """Per-worker Transcriber with its own model."""
+    worker = getattr(_local, "transcriber", None)
+    if worker is None:
+        worker = Transcriber(own_model=True)
+        worker.load()
+        _local.transcriber = worker
+    return worker
+
+
+def _init_worker():
+    """Load the model as soon as a worker starts."""
+    try:
+        _worker_transcriber()
+    except Exception as e:
+        logger.error(f"STT worker init failed: {e}")
+
+
+def _warmup() -> bool:
+    return _worker_transcriber().model is not None
+
+
+def _sync_registry(version: int):
+    """
+    Process workers hold their own copy of the intent registry (constrained
+    vocabulary, cascade acceptance) - re-read intents.json when the parent's
+    version changed. Thread workers share the parent's, the mtime check is a no-op.
+    """
+    global _registry_version
+    if version != _registry_version:
+        registry.reload_if_changed()
+        _registry_version = version
+
+
+def _transcribe_batch(pcms: list, language: str, registry_version: int = None) -> list[str]:
+    if registry_version is not None:
+        _sync_registry(registry_version)
+    return _worker_transcriber().transcribe_batch(pcms, language=language)
+
+
+class TranscriptionPool:
+    """Whisper workers, each holding its own loaded model."""
+
+    def __init__(self, workers: int = STT_WORKERS, mode: str = STT_WORKER_MODE, io_threads: int = STT_IO_THREADS):
+        self.workers = max(1, workers)
+        self.mode = mode
+        self._executor = None
+        # ffmpeg decode and stream pipe I/O (cheap, but must not queue behind decodes)
+        self._io = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="stt-io")
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="stt", initializer=_init_worker
+                )
+            logger.info(f"🧵 STT pool: {self.workers} {self.mode} worker(s)")
+        return self._executor
+
+    async def start(self):
+        """Start workers and wait for their models to load."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*[loop.run_in_executor(executor, _warmup) for _ in range(self.workers)])
+
+    async def transcribe_batch(self, pcms: list, language: str = "th") -> list[str]:
+        """Transcribe a batch of PCM clips on a worker."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), _transcribe_batch, pcms, language, registry.version)
+
+    async def run_io(self, func, *args):
+        """Run blocking audio I/O on the STT I/O threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io, func, *args)
+
+    async def decode(self, audio: bytes, input_format: str | None = "webm"):
+        """Decode WebM (or input_format) bytes to PCM (None on failure)."""
+        return await self.run_io(transcriber.decode, audio, input_format)
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._io.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance
+pool = TranscriptionPool()
@@ -0,0 +1,162 @@
+"""
+Scheduler - Micro-batched Whisper decoding across concurrent clients
+Collects pending requests for a short window and decodes them as one batch
+"""
+import asyncio
+import logging
+from collections import Counter
+
+import numpy as np
+
+from config import STT_BATCH_SIZE, STT_BATCH_WAIT_MS, STT_QUEUE_SIZE
+from .pool import pool as default_pool
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionBusy(Exception):
+    """Raised when the STT admission queue is full."""
+
+
+class TranscriptionScheduler:
+    """Batch pending transcriptions into a single model.decode call."""
+
+    def __init__(self, pool=None, max_batch: int = STT_BATCH_SIZE, max_wait_ms: float = STT_BATCH_WAIT_MS,
+                 max_pending: int = STT_QUEUE_SIZE):
+        self.pool = pool or default_pool
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pending = max(1, max_pending)
+        self.pending = 0
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._tasks = set()
+
+        # Stats
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.batch_sizes = Counter()
+
+    def _ensure_worker(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            # One batch in flight per pool worker
+            self._slots = asyncio.Semaphore(self.pool.workers)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def _admit(self):
+        """Bounded admission - reject instead of growing the backlog."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise TranscriptionBusy(f"STT queue full ({self.pending} pending)")
+        self.pending += 1
+
+    async def transcribe_pcm(self, pcm: np.ndarray, language: str = "th") -> str:
+        """Queue PCM for batched transcription and wait for the result."""
+        self._admit()
+        try:
+            return await self._submit(pcm, language)
+        finally:
+            self.pending -= 1
+
+    async def transcribe_bytes(self, audio: bytes, language: str = "th", input_format: str | None = "webm") -> str:
+        """Decode WebM (or input_format) bytes, then queue for batched transcription."""
+        self._admit()
+        try:
+            pcm = await self.pool.decode(audio, input_format)
+            if pcm is None:
+                return ""
+            return await self._submit(pcm, language)
+        finally:
+            self.pending -= 1
+
+    async def _submit(self, pcm: np.ndarray, language: str) -> str:
+        self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put_nowait((pcm, language, future, loop.time()))
+        return await future
+
+    async def _run(self):
+        """Collect requests for up to max_wait, then decode them together."""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free worker first, so requests pile up into bigger batches
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._decode_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _decode_batch(self, batch: list):
+        try:
+            await self._decode(batch)
+        except Exception as e:
+            logger.error(f"Batch decode error: {e}")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_result("")
+        finally:
+            self._slots.release()
+
+    async def _decode(self, batch: list):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for item in batch:
+            metrics.stt_queue_wait.observe(now - item[3])
+        self.batches += 1
+        self.items += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        if len(batch) > 1:
+            logger.info(f"📦 Decoding batch of {len(batch)}")
+
+        # DecodingOptions.language is per batch - group by language
+        groups = {}
+        for item in batch:
+            groups.setdefault(item[1], []).append(item)
+
+        for language, items in groups.items():
+            start = loop.time()
+            texts = await self.pool.transcribe_batch([item[0] for item in items], language)
+            metrics.stt_batch_decode.observe(loop.time() - start)
+            for (_, _, future, _), text in zip(items, texts):
+                if not future.done():
+                    future.set_result(text)
+
+    def stats(self) -> dict:
+        """Queue depth and batch-size stats."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": max(self.batch_sizes) if self.batch_sizes else 0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "config": {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "max_pending": self.max_pending,
+                "workers": self.pool.workers,
+                "mode": self.pool.mode,
+            },
+        }
+
+
+# Global instance
+scheduler = TranscriptionScheduler()
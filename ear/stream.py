@@ -0,0 +1,161 @@
+"""
+Streaming - Incremental transcription while the user is still talking
+Keeps one ffmpeg decoder alive per utterance, a rolling PCM buffer for
+partials and the whole utterance (from its start) for the final decode
+"""
+import os
+import logging
+import subprocess
+import threading
+
+import numpy as np
+
+from config import FFMPEG_PATH, STREAM_MAX_SEC, STREAM_WINDOW_SEC
+from .transcriber import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Skip partial decodes until there is at least this much audio
+MIN_PARTIAL_SEC = 0.3
+
+
+class StreamingSession:
+    """One push-to-talk utterance streamed in chunks."""
+
+    def __init__(self, input_format: str = "webm", window_sec: float = STREAM_WINDOW_SEC,
+                 max_sec: float = STREAM_MAX_SEC):
+        self.max_samples = int(window_sec * SAMPLE_RATE)
+
+        # Rolling PCM buffer (preallocated, oldest audio dropped when full)
+        self._pcm = np.zeros(self.max_samples, dtype=np.float32)
+        self._n = 0
+        self._lock = threading.Lock()
+
+        # Whole utterance for the final decode - the window drops the start
+        # ("play ...") of anything longer than STREAM_WINDOW_SEC
+        self._chunks = []
+        self._kept = 0
+        self.max_kept = max(int(max_sec * SAMPLE_RATE), self.max_samples)
+
+        self.total_samples = 0
+        self.bytes_received = 0
+        self._partial_at = 0
+        self.last_text = ""
+        self.stable = False
+        self.fired = None  # Command already executed from a partial
+
+        cmd = [
+            FFMPEG_PATH,
+            '-nostdin',
+            '-v', 'error',
+            '-f', input_format,
+            '-ignore_unknown',
+            '-vn', '-sn',
+            '-i', 'pipe:0',
+            '-ar', str(SAMPLE_RATE),
+            '-ac', '1',
+            '-f', 'f32le',
+            '-flush_packets', '1',
+            'pipe:1'
+        ]
+        self._proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._reader = threading.Thread(target=self._read_pcm, daemon=True)
+        self._reader.start()
+
+    def _read_pcm(self):
+        """Read decoded PCM from ffmpeg stdout into the rolling buffer."""
+        fd = self._proc.stdout.fileno()
+        remainder = b""
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - (len(data) % 4)
+            remainder = data[usable:]
+            if usable:
+                self._append(np.frombuffer(data[:usable], dtype=np.float32))
+
+    def _append(self, samples: np.ndarray):
+        with self._lock:
+            n = len(samples)
+            if n >= self.max_samples:
+                self._pcm[:] = samples[-self.max_samples:]
+                self._n = self.max_samples
+            else:
+                overflow = self._n + n - self.max_samples
+                if overflow > 0:
+                    # Drop oldest audio
+                    self._pcm[:self._n - overflow] = self._pcm[overflow:self._n]
+                    self._n -= overflow
+                self._pcm[self._n:self._n + n] = samples
+                self._n += n
+            self.total_samples += n
+
+            keep = min(n, self.max_kept - self._kept)
+            if keep > 0:
+                self._chunks.append(samples[:keep])
+                self._kept += keep
+
+    def feed(self, chunk: bytes):
+        """Push a compressed audio chunk into the decoder."""
+        self.bytes_received += len(chunk)
+        try:
+            self._proc.stdin.write(chunk)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            logger.error(f"Stream decoder closed: {e}")
+
+    def pcm(self) -> np.ndarray:
+        """Snapshot of the rolling PCM buffer."""
+        with self._lock:
+            return self._pcm[:self._n].copy()
+
+    def pending_sec(self) -> float:
+        """Seconds of audio decoded since the last partial."""
+        return (self.total_samples - self._partial_at) / SAMPLE_RATE
+
+    def partial_pcm(self) -> np.ndarray | None:
+        """Audio for the next partial decode (None if too short)."""
+        self._partial_at = self.total_samples
+        pcm = self.pcm()
+        if len(pcm) < MIN_PARTIAL_SEC * SAMPLE_RATE:
+            return None
+        return pcm
+
+    def set_partial(self, text: str):
+        """Record a partial result."""
+        # Same text after more audio arrived -> user has stopped talking
+        self.stable = bool(text) and text == self.last_text
+        self.last_text = text
+
+    def full_pcm(self) -> np.ndarray:
+        """The utterance from its start (up to STREAM_MAX_SEC)."""
+        with self._lock:
+            if not self._chunks:
+                return np.zeros(0, dtype=np.float32)
+            return np.concatenate(self._chunks)
+
+    def flush(self) -> np.ndarray:
+        """Close the decoder input and return the whole utterance."""
+        try:
+            self._proc.stdin.close()
+        except Exception:
+            pass
+        self._reader.join(timeout=5)
+        self.close()
+        return self.full_pcm()
+
+    def close(self):
+        """Stop the decoder process."""
+        if self._proc.poll() is None:
+            try:
+                self._proc.kill()
+            except Exception:
+                pass
+        try:
+            self._proc.wait(timeout=1)
+        except Exception:
+            pass
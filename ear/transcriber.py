@@ -3,12 +3,20 @@ Transcriber - Speech-to-Text using Whisper
 Uses openai-whisper (stable) for voice transcription
 """
 import os
+import time
 import logging
-import tempfile
 import subprocess
 
+import numpy as np
+
 # Set up ffmpeg path BEFORE importing whisper
-from config import WHISPER_MODEL, WHISPER_DEVICE, FFMPEG_PATH, BASE_DIR
+from config import (
+    WHISPER_MODEL, WHISPER_DEVICE, WHISPER_QUANTIZE, FFMPEG_PATH, BASE_DIR, VAD_ENABLED,
+    STT_CONSTRAINED, STT_CONSTRAINED_BIAS,
+    STT_CASCADE, WHISPER_FAST_MODEL, STT_CASCADE_MIN_LOGPROB, STT_CASCADE_MAX_NO_SPEECH
+)
+from .vad import SAMPLE_RATE, trim_silence
+from core import metrics
 
 # Ensure ffmpeg is in PATH
 ffmpeg_dir = os.path.dirname(os.path.abspath(FFMPEG_PATH))
@@ -19,99 +27,230 @@ os.environ["PATH"] = str(BASE_DIR) + os.pathsep + os.environ.get("PATH", "")
 
 logger = logging.getLogger(__name__)
 
-_model = None
+_models = {}
 
 
-def get_model():
-    """Load Whisper model (openai-whisper)."""
-    global _model
-    if _model is None:
-        import whisper
-        
-        model_name = WHISPER_MODEL
-        logger.info(f"Loading Whisper model: {model_name} (device: {WHISPER_DEVICE})")
-        _model = whisper.load_model(model_name)
-        logger.info("✅ Whisper model loaded")
-    return _model
+def load_model(model_name: str = WHISPER_MODEL):
+    """Load a new Whisper model instance (openai-whisper)."""
+    import whisper
+    
+    logger.info(f"Loading Whisper model: {model_name} (device: {WHISPER_DEVICE})")
+    model = whisper.load_model(model_name)
+    if WHISPER_QUANTIZE == "int8":
+        if WHISPER_DEVICE == "cpu":
+            model = quantize_model(model)
+            release_freed_memory()
+            logger.info("⚡ Whisper model quantized (int8 dynamic)")
+        else:
+            logger.warning(f"WHISPER_QUANTIZE=int8 is CPU-only, ignored on {WHISPER_DEVICE}")
+    logger.info("✅ Whisper model loaded")
+    return model
+
+
+def quantize_model(model):
+    """Int8 dynamic quantization of the model's Linear layers (CPU)."""
+    import torch
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            # whisper.model.Linear only adds dtype casting - in fp32 it is a plain
+            # Linear, which is the exact type quantize_dynamic looks for
+            module.__class__ = torch.nn.Linear
+    # In place: the freshly loaded fp32 model is not shared, no second copy at peak
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def release_freed_memory():
+    """Return freed heap pages (the replaced fp32 weights) to the OS - glibc keeps them otherwise."""
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # Not glibc
+
+
+def get_model(model_name: str = WHISPER_MODEL):
+    """Load shared Whisper model (openai-whisper)."""
+    if model_name not in _models:
+        _models[model_name] = load_model(model_name)
+    return _models[model_name]
+
+
+def decode_audio(audio: bytes, input_format: str | None = "webm") -> np.ndarray:
+    """
+    Decode compressed audio bytes to float32 mono 16 kHz PCM in memory.
+    Audio goes through ffmpeg stdin/stdout, no temp files.
+    input_format=None lets ffmpeg detect the container (wav, mp3, ...).
+    """
+    cmd = [FFMPEG_PATH, '-nostdin', '-v', 'error']
+    if input_format:
+        cmd += ['-f', input_format]
+    cmd += [
+        '-ignore_unknown',
+        '-vn', '-sn',        # No video/subs
+        '-i', 'pipe:0',
+        '-ar', str(SAMPLE_RATE),
+        '-ac', '1',
+        '-f', 'f32le',       # Raw float32 PCM -> NumPy directly
+        'pipe:1'
+    ]
+    proc = subprocess.run(cmd, input=audio, check=True, capture_output=True)
+    return np.frombuffer(proc.stdout, dtype=np.float32)
 
 
 class Transcriber:
     """Speech-to-Text transcriber using Whisper."""
     
-    def __init__(self):
+    def __init__(self, own_model: bool = False):
         self.model = None
+        self.fast_model = None  # Cascade: tried first, escalate to self.model
+        # Workers decoding in parallel need their own model
+        # (whisper installs kv-cache hooks on the model during decode)
+        self.own_model = own_model
         
     def load(self):
         """Load the model."""
-        self.model = get_model()
+        load = load_model if self.own_model else get_model
+        self.model = load(WHISPER_MODEL)
+        if STT_CASCADE:
+            self.fast_model = load(WHISPER_FAST_MODEL)
         
     def transcribe(self, audio_path: str, language: str = "th") -> str:
         """Transcribe audio file to text."""
+        logger.info(f"Transcribing: {audio_path} (Language: {language})")
+        try:
+            with open(audio_path, "rb") as f:
+                audio = f.read()
+        except OSError as e:
+            logger.error(f"Cannot read audio file: {e}")
+            return ""
+        return self.transcribe_bytes(audio, language=language)
+        
+    def decode(self, audio: bytes, input_format: str | None = "webm") -> np.ndarray | None:
+        """Decode WebM (or input_format) audio bytes to PCM (None on failure)."""
+        try:
+            start = time.perf_counter()
+            pcm = decode_audio(audio, input_format)
+            metrics.stt_audio_decode.observe(time.perf_counter() - start)
+            return pcm
+        except subprocess.CalledProcessError as e:
+            logger.error(f"FFmpeg decode failed: {e.stderr.decode() if e.stderr else 'Unknown error'}")
+        except Exception as e:
+            logger.error(f"Audio decode error: {e}")
+        return None
+        
+    def transcribe_bytes(self, audio: bytes, language: str = "th") -> str:
+        """Transcribe WebM audio bytes to text (no temp files)."""
+        pcm = self.decode(audio)
+        if pcm is None:
+            return ""
+        return self.transcribe_pcm(pcm, language=language)
+        
+    def prepare(self, pcm: np.ndarray) -> np.ndarray | None:
+        """VAD + pad/trim to the 30 s window. Returns None if the clip has no speech."""
+        if VAD_ENABLED:
+            # Trim silence / reject empty clips before any mel computation
+            total_sec = len(pcm) / SAMPLE_RATE
+            pcm, speech_sec = trim_silence(pcm)
+            if len(pcm) == 0:
+                logger.info(f"🔇 No speech detected ({total_sec:.2f}s clip)")
+                return None
+            logger.info(f"🗣️ Speech: {speech_sec:.2f}s of {total_sec:.2f}s")
+            
         if self.model is None:
             self.load()
             
-        wav_path = None
+        import whisper
+        return whisper.pad_or_trim(pcm)
+        
+    def mel(self, audio: np.ndarray, model=None):
+        """Log-mel spectrogram for the given model."""
+        import whisper
+        model = model or self.model
+        
+        # Get n_mels from model dimensions
+        n_mels = model.dims.n_mels
+        return whisper.log_mel_spectrogram(audio, n_mels=n_mels).to(model.device)
+        
+    def decoding_options(self, language: str = "th"):
+        """Transcription Options"""
+        import whisper
+        # Add initial prompt for better Thai context
+        return whisper.DecodingOptions(
+            language=language, 
+            without_timestamps=True, 
+            fp16=False,
+            prompt="นี่คือการสั่งงานด้วยเสียงภาษาไทย"
+        )
+        
+    def decode_results(self, mels: list, language: str = "th", model=None) -> list:
+        """Decode a batch of mel spectrograms in one model.decode call."""
+        import torch
+        model = model or self.model
+        options = self.decoding_options(language)
+        
+        batch = torch.stack(mels)
+        if STT_CONSTRAINED in ("bias", "restrict"):
+            # Keyword-spotting fast path: steer decoding to the command vocabulary
+            from .constrained import decode_constrained
+            return decode_constrained(model, batch, options, mode=STT_CONSTRAINED, bias=STT_CONSTRAINED_BIAS)
+        return model.decode(batch, options)
+        
+    def decode_mels(self, mels: list, language: str = "th", model=None) -> list[str]:
+        """Decode a batch of mel spectrograms to text."""
+        return [r.text.strip() for r in self.decode_results(mels, language, model)]
+        
+    def transcribe_pcm(self, pcm: np.ndarray, language: str = "th") -> str:
+        """Transcribe float32 16 kHz mono PCM to text."""
+        return self.transcribe_batch([pcm], language=language)[0]
+        
+    def transcribe_batch(self, pcms: list, language: str = "th") -> list[str]:
+        """Transcribe several PCM clips together (one batched decode)."""
+        texts = [""] * len(pcms)
+        start = time.perf_counter()
         try:
-            logger.info(f"Transcribing: {audio_path} (Language: {language})")
-            
-            # Convert to 16kHz WAV first (fixes webm issues)
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                wav_path = f.name
-                
-            # Convert using ffmpeg binary
-            # cmd: ffmpeg -y -f webm -i input.webm -ar 16000 -ac 1 -c:a pcm_s16le output.wav
-            # FFmpeg Command Refinement
-            cmd = [
-                FFMPEG_PATH, '-y',
-                '-v', 'error',       
-                '-f', 'webm',        
-                '-ignore_unknown',   
-                '-vn', '-sn',        # No video/subs
-                '-i', audio_path,
-                '-ar', '16000',      
-                '-ac', '1',          
-                '-c:a', 'pcm_s16le', 
-                wav_path
-            ]
+            audios = [self.prepare(pcm) for pcm in pcms]
+            idx = [i for i, audio in enumerate(audios) if audio is not None]
+            if not idx:
+                return texts
             
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if self.fast_model is not None:
+                decoded = self._cascade([audios[i] for i in idx], language)
+            else:
+                decoded = self.decode_mels([self.mel(audios[i]) for i in idx], language=language)
+            for i, text in zip(idx, decoded):
+                texts[i] = text
+                logger.info(f"Transcribed: {text}")
+            metrics.stt_inference.observe(time.perf_counter() - start)
+            return texts
             
-            # Transcription Options
-            import whisper
-            # Add initial prompt for better Thai context
-            options = whisper.DecodingOptions(
-                language="th", 
-                without_timestamps=True, 
-                fp16=False,
-                prompt="นี่คือการสั่งงานด้วยเสียงภาษาไทย"
-            )
-            
-            # Load from converted WAV
-            audio = whisper.load_audio(wav_path)
-            audio = whisper.pad_or_trim(audio)
-            
-            # Get n_mels from model dimensions
-            n_mels = self.model.dims.n_mels
-            mel = whisper.log_mel_spectrogram(audio, n_mels=n_mels).to(self.model.device)
-            
-            result = self.model.decode(mel, options)
-            text = result.text.strip()
-            
-            logger.info(f"Transcribed: {text}")
-            return text
-            
-        except subprocess.CalledProcessError as e:
-            logger.error(f"FFmpeg conversion failed: {e.stderr.decode() if e.stderr else 'Unknown error'}")
-            return ""
         except Exception as e:
             logger.error(f"Transcription error: {e}")
-            return ""
-        finally:
-            if wav_path and os.path.exists(wav_path):
-                try:
-                    os.unlink(wav_path)
-                except:
-                    pass
+            return texts
+            
+    def _accept(self, result) -> bool:
+        """Is the fast model's result confident enough to skip the large model?"""
+        from core.commands import registry
+        # Exact / pattern matches only - a fuzzy hit is itself a guess
+        return (
+            result.avg_logprob >= STT_CASCADE_MIN_LOGPROB
+            and result.no_speech_prob <= STT_CASCADE_MAX_NO_SPEECH
+            and registry.match(result.text, fuzzy=False) is not None
+        )
+        
+    def _cascade(self, audios: list, language: str) -> list[str]:
+        """Decode with the fast model, re-run low-confidence clips on the large model."""
+        results = self.decode_results([self.mel(a, self.fast_model) for a in audios], language, self.fast_model)
+        texts = [r.text.strip() for r in results]
+        
+        escalate = [i for i, r in enumerate(results) if not self._accept(r)]
+        metrics.stt_cascade.labels("accepted").inc(len(audios) - len(escalate))
+        metrics.stt_cascade.labels("escalated").inc(len(escalate))
+        if escalate:
+            logger.info(f"⬆️ Escalating {len(escalate)}/{len(audios)} clip(s) to {WHISPER_MODEL}")
+            accurate = self.decode_mels([self.mel(audios[i]) for i in escalate], language=language)
+            for i, text in zip(escalate, accurate):
+                texts[i] = text
+        return texts
 
 
 # Global instance
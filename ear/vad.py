@@ -0,0 +1,56 @@
+"""
+VAD - Energy-based voice activity detection (vectorized NumPy)
+Trims leading/trailing silence and rejects clips with no speech
+"""
+import numpy as np
+
+from config import VAD_THRESHOLD_DB, VAD_MIN_SPEECH_SEC
+
+SAMPLE_RATE = 16000
+FRAME_SEC = 0.03      # 30 ms analysis frames
+PAD_SEC = 0.2         # Keep a little context around speech
+MARGIN_DB = 10.0      # Speech must be this far above the noise floor
+
+
+def frame_energy_db(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """RMS energy (dBFS) per frame."""
+    frame = int(sample_rate * FRAME_SEC)
+    n_frames = len(pcm) // frame
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = pcm[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1) + 1e-12)
+    return 20.0 * np.log10(rms)
+
+
+def speech_mask(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE, threshold_db: float = VAD_THRESHOLD_DB) -> np.ndarray:
+    """Boolean mask of frames that contain speech."""
+    db = frame_energy_db(pcm, sample_rate)
+    if len(db) == 0:
+        return np.zeros(0, dtype=bool)
+    # Adaptive threshold: above the noise floor, but never above the loudest
+    # frames (a clip that is all speech has a high "floor")
+    floor = np.percentile(db, 10)
+    peak = db.max()
+    threshold = max(threshold_db, min(floor + MARGIN_DB, peak - MARGIN_DB))
+    return db > threshold
+
+
+def trim_silence(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                 threshold_db: float = VAD_THRESHOLD_DB,
+                 min_speech_sec: float = VAD_MIN_SPEECH_SEC) -> tuple[np.ndarray, float]:
+    """
+    Trim leading and trailing silence.
+    Returns (trimmed_pcm, speech_sec). Empty array if no speech found.
+    """
+    mask = speech_mask(pcm, sample_rate, threshold_db)
+    speech_sec = float(mask.sum()) * FRAME_SEC
+    if speech_sec < min_speech_sec:
+        return pcm[:0], speech_sec
+
+    frame = int(sample_rate * FRAME_SEC)
+    pad = int(sample_rate * PAD_SEC)
+    idx = np.flatnonzero(mask)
+    start = max(0, idx[0] * frame - pad)
+    end = min(len(pcm), (idx[-1] + 1) * frame + pad)
+    return pcm[start:end], speech_sec
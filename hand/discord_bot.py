@@ -1,20 +1,31 @@
 """
 Discord Bot - Commands and music playback
 """
+import time
 import asyncio
 import logging
 import discord
 from discord.ext import commands
 
-from config import DISCORD_TOKEN
+from config import DISCORD_TOKEN, VOLUME_STEP
 from hand.music import music_player
 from mouth.tts import speak
+from core.state import state
+from core import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
 bot_instance = None
 
 
+async def connect_voice(channel) -> discord.VoiceClient:
+    """Connect to a voice channel (connect time goes to /metrics)."""
+    start = time.perf_counter()
+    voice_client = await channel.connect()
+    metrics.voice_connect.observe(time.perf_counter() - start)
+    return voice_client
+
+
 def create_bot():
     """Create Discord bot."""
     global bot_instance
@@ -29,6 +40,7 @@ def create_bot():
     @bot.event
     async def on_ready():
         logger.info(f"✅ Jarvis online: {bot.user}")
+        state.update(discord=True)
         asyncio.create_task(process_commands(bot))
         try:
             synced = await bot.tree.sync()
@@ -36,6 +48,25 @@ def create_bot():
         except Exception as e:
             logger.error(f"Sync error: {e}")
         
+    @bot.event
+    async def on_disconnect():
+        state.update(discord=False)
+    
+    @bot.event
+    async def on_resumed():
+        state.update(discord=True)
+    
+    @bot.event
+    async def on_voice_state_update(member, before, after):
+        # Covers /join, /leave, web join/leave/move and being kicked
+        if member.id != bot.user.id:
+            return
+        channel = after.channel
+        changes = {"voice": channel is not None, "voice_channel": channel.name if channel else None}
+        if channel is None:
+            changes.update(song=None, playing=False, paused=False)
+        state.update(**changes)
+        
     @bot.tree.command(name="join", description="เข้าห้องเสียง")
     async def join(interaction: discord.Interaction):
         if not interaction.user.voice:
@@ -43,7 +74,7 @@ def create_bot():
             return
         await interaction.response.defer()
         channel = interaction.user.voice.channel
-        voice_client = await channel.connect()
+        voice_client = await connect_voice(channel)
         await interaction.followup.send(f"✅ เข้าห้อง **{channel.name}** แล้วครับ")
         
         # รอให้ voice connection พร้อมก่อนพูด
@@ -68,7 +99,7 @@ def create_bot():
         if not interaction.guild.voice_client:
             if interaction.user.voice:
                 try:
-                    await interaction.user.voice.channel.connect()
+                    await connect_voice(interaction.user.voice.channel)
                 except Exception as e:
                     await interaction.followup.send(f"❌ เชื่อมต่อห้องเสียงไม่ได้: {e}")
                     return
@@ -95,15 +126,24 @@ async def process_commands(bot):
     """Process commands from web interface."""
     from web.server import command_queue
     
+    # Merged volume_up/down bursts are resolved against the live level
+    command_queue.volume_level = lambda: int(music_player.volume * 100)
+    
     logger.info("🎵 Waiting for commands from web...")
     
     while True:
+        trace = None
         try:
             cmd = await asyncio.wait_for(command_queue.get(), timeout=1.0)
             
             func = cmd.get("function")
             args = cmd.get("args", {})
             
+            # yt-dlp / TTS spans below land in the command's trace
+            trace = cmd.get("trace")
+            tracing.activate(trace)
+            execute_start = time.perf_counter()
+            
             logger.info(f"📥 Received: {func}({args})")
             
             # Get voice client
@@ -127,7 +167,7 @@ async def process_commands(bot):
                 channel = find_active_channel(bot.guilds)
                 if channel:
                     logger.info(f"Joining {channel.name}...")
-                    voice_client = await channel.connect()
+                    voice_client = await connect_voice(channel)
                     
                     # Custom Join Sound: Find ANY audio file in assets
                     import os
@@ -167,6 +207,7 @@ async def process_commands(bot):
 
             if not voice_client:
                 logger.warning("⚠️ No voice client - use /join first!")
+                tracing.finish(trace, "no_voice")
                 continue
 
             if func == "leave":
@@ -190,7 +231,9 @@ async def process_commands(bot):
                 
                 if target_channel:
                     await speak("กำลังย้ายห้องครับ", voice_client)
+                    start = time.perf_counter()
                     await voice_client.move_to(target_channel)
+                    metrics.voice_connect.observe(time.perf_counter() - start)
                     await asyncio.sleep(1) # Wait for move
                     await speak("ตามมาแล้วครับ", voice_client)
                 else:
@@ -223,16 +266,16 @@ async def process_commands(bot):
                 await music_player.skip(voice_client)
                 
             elif func == "volume_up":
-                # Increase volume by 20%
+                # Increase volume by VOLUME_STEP (20%)
                 current_vol = int(music_player.volume * 100)
-                new_vol = min(100, current_vol + 20)
+                new_vol = min(100, current_vol + VOLUME_STEP)
                 music_player.set_volume(new_vol, voice_client)
                 logger.info(f"🔊 Volume up: {new_vol}%")
                 
             elif func == "volume_down":
-                # Decrease volume by 20%
+                # Decrease volume by VOLUME_STEP (20%)
                 current_vol = int(music_player.volume * 100)
-                new_vol = max(0, current_vol - 20)
+                new_vol = max(0, current_vol - VOLUME_STEP)
                 music_player.set_volume(new_vol, voice_client)
                 logger.info(f"🔉 Volume down: {new_vol}%")
 
@@ -246,6 +289,13 @@ async def process_commands(bot):
             break
         except Exception as e:
             logger.error(f"Command error: {e}")
+            tracing.finish(trace, "error")
+        finally:
+            if trace is not None:
+                trace.add_span("execute", execute_start, time.perf_counter(), function=func)
+                if trace.status == "active":
+                    trace.finish()
+                tracing.activate(None)
 
 
 async def run_bot():
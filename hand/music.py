@@ -2,11 +2,14 @@
 Music Player - YouTube playback via yt-dlp and FFmpeg
 Simple and reliable without external servers
 """
+import time
 import asyncio
 import logging
 import discord
 import yt_dlp
 from config import FFMPEG_PATH
+from core.state import state
+from core import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +38,7 @@ class MusicPlayer:
         self.current_song = None
         self.is_playing = False
         self.volume = 0.5
+        self._generation = 0  # Bumped per song - ignore "ended" of a replaced song
         
     async def play_music(self, query: str, voice_client: discord.VoiceClient) -> str:
         """Search and play music from YouTube."""
@@ -52,6 +56,7 @@ class MusicPlayer:
                         search = query
                     return ydl.extract_info(search, download=False)
             
+            start = time.perf_counter()
             info = await loop.run_in_executor(None, extract)
             
             if 'entries' in info:
@@ -73,6 +78,8 @@ class MusicPlayer:
                         return ydl.extract_info(url, download=False)
                 info = await loop.run_in_executor(None, get_direct)
                 url = info.get('url')
+            metrics.ytdlp_extract.observe(time.perf_counter() - start)
+            tracing.record("ytdlp.extract", start, query=query)
                 
             if not url:
                 logger.error("No audio URL found")
@@ -94,8 +101,11 @@ class MusicPlayer:
             source = discord.PCMVolumeTransformer(source)
             source.volume = self.volume
             
-            voice_client.play(source, after=lambda e: self._on_end(e))
+            self._generation += 1
+            generation = self._generation
+            voice_client.play(source, after=lambda e: self._on_end(e, generation))
             self.is_playing = True
+            state.update(song=title, playing=True, paused=False)
             
             return title
             
@@ -105,23 +115,29 @@ class MusicPlayer:
             traceback.print_exc()
             return None
             
-    def _on_end(self, error):
+    def _on_end(self, error, generation: int = None):
+        # Runs on discord.py's player thread
         if error:
             logger.error(f"Player error: {error}")
+        if generation is not None and generation != self._generation:
+            return  # Stopped to make way for a newer song
         self.is_playing = False
         self.current_song = None
+        state.update(song=None, playing=False, paused=False)
             
     async def stop_music(self, voice_client) -> bool:
         if voice_client and voice_client.is_playing():
             voice_client.stop()
             self.is_playing = False
             self.current_song = None
+            state.update(song=None, playing=False, paused=False)
             return True
         return False
         
     async def pause_music(self, voice_client) -> bool:
         if voice_client and voice_client.is_playing():
             voice_client.pause()
+            state.update(paused=True)
             return True
         return False
         
@@ -129,6 +145,7 @@ class MusicPlayer:
         if voice_client:
             if voice_client.is_paused():
                 voice_client.resume()
+                state.update(paused=False)
                 logger.info("▶️ Resumed music")
                 return True
             else:
@@ -141,6 +158,7 @@ class MusicPlayer:
         """Set volume (0-100)."""
         vol = max(0, min(100, level)) / 100.0
         self.volume = vol
+        state.update(volume=round(vol * 100))
         if voice_client and voice_client.source and isinstance(voice_client.source, discord.PCMVolumeTransformer):
             voice_client.source.volume = vol
         
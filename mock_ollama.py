@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Mock Ollama - Ollama API stand-in สำหรับ benchmark / ทดสอบ brain/llm.py โดยไม่ต้องมี GPU
+
+Speaks the subset brain/llm.py uses:
+  POST /api/chat   stream (NDJSON) or single JSON, options.num_predict, keep_alive
+  GET  /api/tags   model list (startup probe)
+  GET  /mock/stats requests / aborted generations / cold loads (not part of Ollama)
+
+Answers are rule-based: the "phrase → token" lines of the command filter system
+prompt are matched against the user text (longest phrase contained wins, else
+IGNORE), unless --responses maps the exact user text to a canned answer.
+Timing: --load-ms when the model isn't loaded (keep_alive expired), then
+--ttft-ms to the first token, then --tps tokens per second. --think-tokens adds
+a deepseek-r1 style <think> preamble, --trailing-tokens chatter after the answer
+(what streaming early stop saves).
+
+Usage:
+  python mock_ollama.py                                  # :11434, 150 ms TTFT, 40 tok/s
+  python mock_ollama.py --port 11500 --think-tokens 60 --load-ms 3000
+  python mock_ollama.py --ttft-ms 0 --tps 0              # instant (client overhead only)
+"""
+import re
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+ALLOWED_LINE = re.compile(r"^(.+?)\s*→\s*(\S+)\s*$", re.M)
+THINK_WORDS = "the user said something so I should check the allowed command list carefully".split()
+TRAILING_WORDS = "this matches the allowed command exactly and nothing else was said".split()
+
+
+def parse_keep_alive(value) -> float | None:
+    """Ollama keep_alive ("5m", "30s", "1h", seconds, negative = forever) -> seconds (None = forever)."""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return None if value < 0 else float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return 300.0
+    number = float(match.group(1))
+    if number < 0:
+        return None
+    return number * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[match.group(2)]
+
+
+def tokenize(text: str) -> list[str]:
+    """Rough tokens: words with their leading space, long words split in 4-char pieces."""
+    tokens = []
+    for word in re.findall(r"\s*\S+", text):
+        tokens.extend(word[i:i + 4] for i in range(0, len(word), 4))
+    return tokens or [""]
+
+
+class MockModel:
+    """Answer selection, timing and counters."""
+
+    def __init__(self, name: str, ttft_ms: float, tps: float, load_ms: float, think_tokens: int,
+                 trailing_tokens: int = 0, responses: dict = None):
+        self.name = name
+        self.ttft = ttft_ms / 1000
+        self.tps = tps
+        self.load = load_ms / 1000
+        self.think_tokens = think_tokens
+        self.trailing_tokens = trailing_tokens
+        self.responses = responses or {}
+        self.loaded_until = 0.0
+
+        self.requests = 0
+        self.streamed = 0
+        self.completed = 0
+        self.aborted = 0
+        self.loads = 0
+        self.active = 0
+
+    def answer(self, messages: list) -> str:
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        if user in self.responses:
+            return self.responses[user]
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        text = user.strip().lower()
+        allowed = sorted(ALLOWED_LINE.findall(system), key=lambda pair: len(pair[0]), reverse=True)
+        for phrase, token in allowed:
+            if phrase.strip().lower() in text:
+                return token
+        return "IGNORE"
+
+    def tokens(self, messages: list, num_predict: int = None) -> list[str]:
+        preamble = []
+        if self.think_tokens:
+            words = [" " + THINK_WORDS[i % len(THINK_WORDS)] for i in range(self.think_tokens)]
+            preamble = ["<think>\n"] + words + ["\n</think>\n\n"]
+        trailing = [" " + TRAILING_WORDS[i % len(TRAILING_WORDS)] for i in range(self.trailing_tokens)]
+        if trailing:
+            trailing[0] = "\n\n" + trailing[0].lstrip()
+        tokens = preamble + tokenize(self.answer(messages)) + trailing
+        if num_predict is not None and num_predict >= 0:
+            tokens = tokens[:max(num_predict, 1)]
+        return tokens
+
+    async def wait_loaded(self, keep_alive) -> float:
+        """Sleep for a cold load if the keep-alive window has passed; returns load seconds."""
+        now = time.monotonic()
+        load = 0.0
+        if now >= self.loaded_until and self.load:
+            self.loads += 1
+            load = self.load
+            await asyncio.sleep(load)
+        window = parse_keep_alive(keep_alive)
+        self.loaded_until = float("inf") if window is None else time.monotonic() + window
+        return load
+
+    async def token_delay(self, index: int):
+        if index == 0:
+            delay = self.ttft
+        else:
+            delay = 1 / self.tps if self.tps > 0 else 0
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "streamed": self.streamed,
+            "completed": self.completed,
+            "aborted": self.aborted,
+            "cold_loads": self.loads,
+            "active": self.active,
+        }
+
+
+def chunk(model: str, content: str, done: bool = False, **extra) -> dict:
+    return {
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": content},
+        "done": done,
+        **extra,
+    }
+
+
+def durations(total: float, load: float, first: float, count: int) -> dict:
+    """Ollama's timing fields: load, prompt eval (up to the first token), generation."""
+    return {
+        "total_duration": int(total * 1e9),
+        "load_duration": int(load * 1e9),
+        "prompt_eval_duration": int((first - load) * 1e9),
+        "eval_count": count,
+        "eval_duration": int((total - first) * 1e9),
+    }
+
+
+def create_app(model: MockModel) -> FastAPI:
+    app = FastAPI(title="Mock Ollama")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": model.name, "model": model.name, "size": 0, "digest": "mock"}]}
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-mock"}
+
+    @app.get("/mock/stats")
+    async def stats():
+        return model.stats()
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model.requests += 1
+        messages = body.get("messages", [])
+        options = body.get("options") or {}
+        tokens = model.tokens(messages, options.get("num_predict"))
+        start = time.perf_counter()
+
+        if not body.get("stream", True):
+            model.active += 1
+            try:
+                load = await model.wait_loaded(body.get("keep_alive"))
+                first = None
+                for i in range(len(tokens)):
+                    await model.token_delay(i)
+                    first = first or time.perf_counter() - start
+            finally:
+                model.active -= 1
+            model.completed += 1
+            total = time.perf_counter() - start
+            return JSONResponse(chunk(
+                model.name, "".join(tokens), True, done_reason="stop",
+                **durations(total, load, first or total, len(tokens))
+            ))
+
+        async def generate():
+            model.streamed += 1
+            model.active += 1
+            finished = False
+            try:
+                load = await model.wait_loaded(body.get("keep_alive"))
+                first = None
+                for i, token in enumerate(tokens):
+                    await model.token_delay(i)
+                    first = first or time.perf_counter() - start
+                    yield json.dumps(chunk(model.name, token)) + "\n"
+                total = time.perf_counter() - start
+                finished = True
+                yield json.dumps(chunk(
+                    model.name, "", True, done_reason="stop",
+                    **durations(total, load, first or total, len(tokens))
+                )) + "\n"
+            finally:
+                # Client closed the response early -> generation stops here, like Ollama
+                model.active -= 1
+                if finished:
+                    model.completed += 1
+                else:
+                    model.aborted += 1
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama chat API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="mock", help="Name reported by /api/tags")
+    parser.add_argument("--ttft-ms", type=float, default=150.0, help="Delay before the first token")
+    parser.add_argument("--tps", type=float, default=40.0, help="Tokens per second after the first (0 = instant)")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Cold model load when keep_alive has expired")
+    parser.add_argument("--think-tokens", type=int, default=0, help="<think> preamble length in tokens")
+    parser.add_argument("--trailing-tokens", type=int, default=0, help="Chatter after the answer in tokens")
+    parser.add_argument("--responses", help="JSON file {user text: answer} overriding the rule-based answers")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses = json.load(f)
+
+    model = MockModel(args.model, args.ttft_ms, args.tps, args.load_ms, args.think_tokens,
+                      args.trailing_tokens, responses)
+    uvicorn.run(create_app(model), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
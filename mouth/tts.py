@@ -2,6 +2,7 @@
 TTS - Text-to-Speech using Edge-TTS
 Generates Thai speech for Jarvis responses
 """
+import time
 import asyncio
 import tempfile
 import logging
@@ -9,6 +10,7 @@ import os
 import discord
 import edge_tts
 from config import TTS_VOICE, TTS_ENABLED, FFMPEG_PATH
+from core import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +18,15 @@ logger = logging.getLogger(__name__)
 async def generate_speech(text: str) -> str:
     """Generate speech audio file from text."""
     try:
+        start = time.perf_counter()
         communicate = edge_tts.Communicate(text, TTS_VOICE)
         
         with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
             temp_path = f.name
             
         await communicate.save(temp_path)
+        metrics.tts_synthesis.observe(time.perf_counter() - start)
+        tracing.record("tts.synthesis", start)
         return temp_path
         
     except Exception as e:
@@ -68,11 +73,14 @@ async def speak(text: str, voice_client: discord.VoiceClient):
         # Play TTS with explicit ffmpeg path
         logger.info(f"Using ffmpeg: {FFMPEG_PATH}")
         source = discord.FFmpegPCMAudio(audio_path, executable=FFMPEG_PATH)
+        start = time.perf_counter()
         voice_client.play(source, after=after_play)
         
         # Wait for TTS to finish (max 10 seconds)
         try:
             await asyncio.wait_for(finished.wait(), timeout=10.0)
+            metrics.tts_playback.observe(time.perf_counter() - start)
+            tracing.record("tts.playback", start)
         except asyncio.TimeoutError:
             logger.warning("TTS timeout, stopping")
             if voice_client.is_playing():
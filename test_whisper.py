@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
 Test Whisper STT - ทดสอบว่า Whisper model โหลดและ transcribe ได้ถูกต้อง
+(จับเวลาแต่ละขั้นด้วย benchmark_stt.py)
 """
 import os
 import sys
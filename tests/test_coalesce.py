@@ -0,0 +1,106 @@
+"""
+Web -> Discord command queue: merging and debouncing (web/coalesce.py)
+"""
+import asyncio
+import time
+
+from web.coalesce import CoalescingQueue
+
+
+def command(function: str, **args) -> dict:
+    return {"function": function, "args": args, "response": ""}
+
+
+def drain(queue: CoalescingQueue, timeout: float = 1.0) -> list[dict]:
+    """Everything the consumer would receive, in order."""
+    async def main():
+        out = []
+        while queue.qsize():
+            out.append(await asyncio.wait_for(queue.get(), timeout))
+        return out
+    return asyncio.run(main())
+
+
+def test_volume_steps_merge_into_one_absolute_level():
+    queue = CoalescingQueue(debounce_ms=10, volume_step=10)
+    queue.volume_level = lambda: 50
+    for function in ("volume_up", "volume_up", "volume_up", "volume_down"):
+        queue.put_nowait(command(function))
+    [cmd] = drain(queue)
+    assert cmd["function"] == "set_volume"
+    assert cmd["args"] == {"level": 70}
+    assert queue.stats()["merged_volume"] == 3
+
+
+def test_volume_steps_replay_from_a_queued_absolute_level_with_clamping():
+    queue = CoalescingQueue(debounce_ms=10, volume_step=10)
+    queue.put_nowait(command("set_volume", level=95))
+    queue.put_nowait(command("volume_up"))
+    queue.put_nowait(command("volume_up"))
+    [cmd] = drain(queue)
+    assert cmd["args"] == {"level": 100}
+
+
+def test_newer_song_replaces_a_queued_one():
+    queue = CoalescingQueue(debounce_ms=10)
+    queue.put_nowait(command("play_music", song_name="a"))
+    queue.put_nowait(command("play_music", song_name="b"))
+    [cmd] = drain(queue)
+    assert cmd["args"] == {"song_name": "b"}
+
+
+def test_pause_then_resume_keeps_the_resume():
+    # Paused, "pause" (no-op) then "resume" -> music must resume
+    queue = CoalescingQueue(debounce_ms=10)
+    queue.put_nowait(command("play_music", song_name="a"))  # Consumer busy -> both still queued
+    queue.put_nowait(command("pause_music"))
+    queue.put_nowait(command("resume_music"))
+    assert [c["function"] for c in drain(queue)] == ["play_music", "resume_music"]
+    assert queue.stats()["replaced_state"] == 1
+
+
+def test_resume_then_pause_keeps_the_pause():
+    # Playing, "resume" (no-op) then "pause" -> music must stop
+    queue = CoalescingQueue(debounce_ms=10)
+    queue.put_nowait(command("play_music", song_name="a"))
+    queue.put_nowait(command("resume_music"))
+    queue.put_nowait(command("pause_music"))
+    assert [c["function"] for c in drain(queue)] == ["play_music", "pause_music"]
+
+
+def test_pause_alone_is_not_debounced():
+    queue = CoalescingQueue(debounce_ms=1000)
+    queue.put_nowait(command("pause_music"))
+    start = time.perf_counter()
+    [cmd] = drain(queue, timeout=0.5)
+    assert cmd["function"] == "pause_music"
+    assert time.perf_counter() - start < 0.1
+
+
+def test_volume_is_held_for_the_debounce_window():
+    queue = CoalescingQueue(debounce_ms=50, volume_step=10)
+    queue.volume_level = lambda: 50
+    start = time.perf_counter()
+    queue.put_nowait(command("volume_up"))
+    drain(queue)
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_debounce_never_exceeds_the_max_delay():
+    queue = CoalescingQueue(debounce_ms=50, max_delay_ms=80, volume_step=10)
+    queue.volume_level = lambda: 50
+
+    async def main():
+        start = time.perf_counter()
+        consumer = asyncio.create_task(queue.get())
+        for _ in range(10):
+            queue.put_nowait(command("volume_up"))  # Each one restarts the window
+            await asyncio.sleep(0.02)
+            if consumer.done():
+                break
+        cmd = await consumer
+        return cmd, time.perf_counter() - start
+
+    cmd, elapsed = asyncio.run(main())
+    assert elapsed < 0.15
+    assert cmd["function"] == "set_volume"
@@ -0,0 +1,64 @@
+"""
+Command-vocabulary constrained decoding (ear/constrained.py)
+"""
+import torch
+from whisper.tokenizer import get_tokenizer
+
+from ear.constrained import CommandFilter, get_trie
+
+
+def make_filter(mode: str):
+    tokenizer = get_tokenizer(multilingual=True, language="th", task="transcribe")
+    sample_begin = len(tokenizer.sot_sequence)
+    tokens = torch.tensor([list(tokenizer.sot_sequence)])
+    return tokenizer, CommandFilter(get_trie(tokenizer), sample_begin, tokenizer.eot, mode=mode), tokens
+
+
+def test_restrict_allows_eot_before_any_command_token():
+    # Non-command audio: the model prefers ending the transcript
+    tokenizer, command_filter, tokens = make_filter("restrict")
+    logits = torch.randn(1, tokenizer.encoding.n_vocab)
+    logits[0, tokenizer.eot] = 100.0
+    command_filter.apply(logits, tokens)
+    assert logits[0].argmax().item() == tokenizer.eot
+
+
+def test_restrict_still_masks_off_vocabulary_tokens():
+    tokenizer, command_filter, tokens = make_filter("restrict")
+    logits = torch.zeros(1, tokenizer.encoding.n_vocab)
+    command_filter.apply(logits, tokens)
+    allowed = set(torch.isfinite(logits[0]).nonzero().flatten().tolist())
+    assert tokenizer.eot in allowed
+    assert allowed - {tokenizer.eot} == set(command_filter.trie.children)
+
+
+def noise_model():
+    """Tiny Whisper whose decoder always prefers ending the transcript."""
+    from whisper.model import ModelDimensions, Whisper
+
+    tokenizer = get_tokenizer(multilingual=True, language="th", task="transcribe")
+    dims = ModelDimensions(
+        n_mels=80, n_audio_ctx=1500, n_audio_state=8, n_audio_head=1, n_audio_layer=1,
+        n_vocab=tokenizer.encoding.n_vocab, n_text_ctx=448, n_text_state=8, n_text_head=1, n_text_layer=1,
+    )
+    model = Whisper(dims).eval()
+    with torch.no_grad():
+        model.decoder.positional_embedding.zero_()  # Allocated with torch.empty
+        # Final layer norm emits all-ones -> logits are the row sums of the embedding
+        model.decoder.ln.weight.zero_()
+        model.decoder.ln.bias.fill_(1.0)
+        model.decoder.token_embedding.weight.zero_()
+        model.decoder.token_embedding.weight[tokenizer.eot] = 1.0
+    return model
+
+
+def test_restrict_decode_lets_noise_end_empty():
+    # Runs the full decoding task, SuppressBlank included
+    import whisper
+    from ear.constrained import decode_constrained
+
+    options = whisper.DecodingOptions(language="th", without_timestamps=True, fp16=False)
+    mel = torch.zeros(1, 80, 3000)
+    result = decode_constrained(noise_model(), mel, options, mode="restrict")[0]
+    assert result.tokens == []
+    assert result.text == ""
@@ -0,0 +1,107 @@
+"""
+Early firing from partial transcriptions (web/server.py process_partial / finish_stream)
+STT is scripted - no Whisper, no ffmpeg
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from web import server
+from core.commands import registry
+
+
+class FakeSession:
+    """StreamingSession stand-in: fixed PCM, same stability rule."""
+
+    def __init__(self):
+        self.fired = None
+        self.stable = False
+        self.last_text = ""
+        self.bytes_received = 0
+
+    def partial_pcm(self):
+        return np.zeros(16000, dtype=np.float32)
+
+    def set_partial(self, text: str):
+        self.stable = bool(text) and text == self.last_text
+        self.last_text = text
+
+    def flush(self):
+        return np.zeros(16000, dtype=np.float32)
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data: dict):
+        self.sent.append(data)
+
+
+@pytest.fixture
+def utterance(monkeypatch):
+    """Runs partials then the final decode; returns (queued commands, client messages)."""
+    queued = []
+
+    async def put(item):
+        queued.append(item)
+
+    monkeypatch.setattr(server.command_queue, "put", put)
+
+    def run(partials: list[str], final: str):
+        texts = iter(partials + [final])
+
+        async def transcribe_pcm(pcm, language=None):
+            return next(texts)
+
+        monkeypatch.setattr(server.stt_scheduler, "transcribe_pcm", transcribe_pcm)
+        session, client = FakeSession(), FakeClient()
+
+        async def main():
+            for _ in partials:
+                await server.process_partial(session, client)
+            text = await server.finish_stream(session, None, client)
+            if text:
+                await server.process_text(text, client)
+
+        asyncio.run(main())
+        return [item["function"] for item in queued], client.sent
+
+    return run
+
+
+def test_prefix_of_other_intent_waits_for_final(utterance):
+    # "เปลี่ยน" (skip) is the start of "เปลี่ยนห้อง" (move_channel)
+    commands, _ = utterance(["เปลี่ยน", "เปลี่ยน"], "เปลี่ยนห้อง")
+    assert commands == ["move_channel"]
+
+
+@pytest.mark.parametrize("partial", ["เปิด", "เล่น", "เอาเพลง"])
+def test_play_prefix_never_fires_early(utterance, partial):
+    commands, _ = utterance([partial, partial], partial + " lofi")
+    assert commands == ["play_music"]
+
+
+def test_unambiguous_phrase_fires_once(utterance):
+    commands, sent = utterance(["หยุด", "หยุด"], "หยุด")
+    assert commands == ["pause_music"]
+    assert [m["type"] for m in sent].count("response") == 1
+
+
+def test_final_text_never_dispatches_again(utterance):
+    commands, _ = utterance(["ข้าม", "ข้าม"], "ข้ามเพลงแล้วออก")
+    assert commands == ["skip"]
+
+
+def test_empty_final_after_early_fire_ends_utterance(utterance):
+    commands, sent = utterance(["หยุด", "หยุด"], "")
+    assert commands == ["pause_music"]
+    assert sent[-1]["type"] == "final"
+
+
+def test_match_complete():
+    assert registry.match_complete("เปลี่ยน") is None
+    assert registry.match_complete("เอาเพลง") is None
+    assert registry.match_complete("เสียงดังไป") is None
+    assert registry.match_complete("ข้ามเพลง")["function"] == "skip"
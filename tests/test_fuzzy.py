@@ -0,0 +1,54 @@
+"""
+Fuzzy fallback of the command matcher (core/fuzzy.py, IntentIndex._fuzzy)
+"""
+import pytest
+
+from core.commands import IntentIndex, registry
+from core.fuzzy import DeletionIndex, levenshtein
+
+
+@pytest.fixture(scope="module")
+def index():
+    # Shipped defaults, independent of FUZZY_* in the environment
+    return IntentIndex(registry.spec, max_distance=2, min_confidence=0.8)
+
+
+def test_deletion_index_matches_a_linear_scan():
+    words = ["หยุดเพลง", "ข้ามเพลง", "เปลี่ยนห้อง", "resume", "pause", "unpause"]
+    deletion_index = DeletionIndex(words, max_distance=2)
+    for query in ["หยุดเพลล", "ข้ามเพง", "resme", "pase", "xyz", ""]:
+        expected = sorted((levenshtein(query, w), w) for w in words if levenshtein(query, w) <= 2)
+        assert deletion_index.search(query, 2) == expected
+
+
+@pytest.mark.parametrize("text, function", [
+    ("หยุดเพลล", "pause_music"),      # Last consonant misheard
+    ("ข้ามเพง", "skip"),              # Dropped consonant
+    ("เปลี่ยนหอง", "move_channel"),   # Dropped tone mark
+    ("resme", "resume_music"),
+])
+def test_near_miss_is_rescued(index, text, function):
+    result = index.match(text)
+    assert result["function"] == function
+    assert 0.8 <= result["confidence"] < 1.0
+
+
+@pytest.mark.parametrize("text", [
+    # "off" is one vowel away from "on" - never resume music
+    "ปิดเพลง", "ปิดเลย", "ปิดให้หน่อย", "ปิดดนตรี",
+    # A known phrase with extra letters / words is something else
+    "pauses", "leaves", "เปลี่ยนเพลงที",
+])
+def test_meaning_changing_near_miss_is_left_to_the_llm(index, text):
+    assert index.match(text) is None
+
+
+def test_fuzzy_can_be_skipped(index):
+    assert index.match("หยุดเพลล", fuzzy=False) is None
+    assert index.match("หยุดเพลง", fuzzy=False)["confidence"] == 1.0
+
+
+def test_short_phrases_need_an_exact_match(index):
+    # 1 edit in a 3-character phrase is below min_confidence
+    assert index.match("ข้า") is None
+    assert index.match("พัด") is None
@@ -0,0 +1,37 @@
+"""
+Prometheus exposition (core/metrics.py)
+"""
+import pytest
+
+from core.metrics import Registry
+
+
+def test_labelled_counter_renders_one_series_per_label():
+    registry = Registry()
+    counter = registry.counter("jarvis_test_total", "Test", ("reason",))
+    counter.labels("queue_full").inc()
+    counter.labels("queue_full").inc(2)
+    counter.labels("send_timeout").inc()
+    text = registry.render()
+    assert 'jarvis_test_total{reason="queue_full"} 3' in text
+    assert 'jarvis_test_total{reason="send_timeout"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram("jarvis_test_seconds", "Test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    text = registry.render()
+    assert 'jarvis_test_seconds_bucket{le="0.1"} 1' in text
+    assert 'jarvis_test_seconds_bucket{le="1"} 2' in text
+    assert 'jarvis_test_seconds_bucket{le="+Inf"} 3' in text
+    assert "jarvis_test_seconds_count 3" in text
+
+
+def test_labels_on_a_metric_without_label_names_is_rejected():
+    registry = Registry()
+    with pytest.raises(ValueError):
+        registry.gauge("jarvis_test_depth", "Test", func=lambda: 1).labels("x")
+    with pytest.raises(ValueError):
+        registry.counter("jarvis_test_total", "Test", ("reason",)).labels("a", "b")
@@ -0,0 +1,64 @@
+"""
+Streaming session buffers (ear/stream.py)
+ffmpeg is replaced by a pipe that passes f32le PCM straight through
+"""
+import os
+
+import numpy as np
+import pytest
+
+from ear import stream
+from ear.stream import StreamingSession
+
+SAMPLE_RATE = 16000
+
+
+class Passthrough:
+    """Popen stand-in: bytes written to stdin come back on stdout."""
+
+    def __init__(self, *args, **kwargs):
+        read_fd, write_fd = os.pipe()
+        self.stdin = os.fdopen(write_fd, "wb")
+        self.stdout = os.fdopen(read_fd, "rb")
+
+    def poll(self):
+        return 0
+
+    def kill(self):
+        pass
+
+    def wait(self, timeout=None):
+        return 0
+
+
+@pytest.fixture(autouse=True)
+def passthrough(monkeypatch):
+    monkeypatch.setattr(stream.subprocess, "Popen", Passthrough)
+
+
+def feed_seconds(session: StreamingSession, seconds: float):
+    """Ramp signal: each sample's value is its index, so positions are checkable."""
+    pcm = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    for chunk in np.array_split(pcm, 10):
+        session.feed(chunk.tobytes())
+    return pcm
+
+
+def test_final_decode_keeps_the_start_of_a_long_utterance():
+    session = StreamingSession(window_sec=1, max_sec=10)
+    pcm = feed_seconds(session, 3)
+    final = session.flush()
+    np.testing.assert_array_equal(final, pcm)
+
+
+def test_partials_use_the_rolling_window():
+    session = StreamingSession(window_sec=1, max_sec=10)
+    pcm = feed_seconds(session, 3)
+    session.flush()
+    np.testing.assert_array_equal(session.partial_pcm(), pcm[-SAMPLE_RATE:])
+
+
+def test_whole_utterance_is_capped_from_the_start():
+    session = StreamingSession(window_sec=1, max_sec=2)
+    pcm = feed_seconds(session, 3)
+    np.testing.assert_array_equal(session.flush(), pcm[:2 * SAMPLE_RATE])
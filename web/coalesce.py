@@ -0,0 +1,181 @@
+"""
+Coalesce - Web -> Discord command queue with debouncing
+Bursts from push-to-talk spam collapse before they reach the music player:
+  volume_up / volume_down / set_volume  -> one set_volume with the net level
+  play_music X, play_music Y            -> play_music Y (X never extracted)
+  pause_music, resume_music             -> resume_music (the last state asked for)
+"""
+import time
+import asyncio
+from collections import deque
+
+from config import COMMAND_DEBOUNCE_MS, COMMAND_DEBOUNCE_MAX_MS, VOLUME_STEP
+from core import metrics
+
+VOLUME_FUNCTIONS = ("volume_up", "volume_down", "set_volume")
+# Set a state (safe to repeat): a newer one replaces a queued one, never held
+STATE_FUNCTIONS = ("pause_music", "resume_music")
+# Held for the debounce window so a follow-up can still merge into them
+COALESCABLE = VOLUME_FUNCTIONS + ("play_music",)
+
+
+class _Pending:
+    __slots__ = ("cmd", "queued_at", "ready_at", "deadline", "volume_ops")
+
+    def __init__(self, cmd: dict, now: float, debounce: float, max_delay: float):
+        self.cmd = cmd
+        self.queued_at = now
+        hold = cmd.get("function") in COALESCABLE
+        self.ready_at = now + debounce if hold else now
+        self.deadline = now + max_delay if hold else now
+        self.volume_ops = None  # [(function, args)] once volume commands are merged
+
+
+class CoalescingQueue:
+    """
+    asyncio.Queue replacement (put / get / qsize) that merges pending commands.
+    Only commands still in the queue are touched - nothing already executing.
+    """
+
+    def __init__(self, debounce_ms: float = COMMAND_DEBOUNCE_MS, max_delay_ms: float = COMMAND_DEBOUNCE_MAX_MS,
+                 volume_step: int = VOLUME_STEP):
+        self.debounce = debounce_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.volume_step = volume_step
+        self.volume_level = None  # callable -> current level (0-100), set by the consumer
+        self._items = deque()
+        self._changed = asyncio.Event()
+
+        self.received = 0
+        self.delivered = 0
+        self.merged_volume = 0
+        self.replaced_play = 0
+        self.replaced_state = 0
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    async def put(self, cmd: dict):
+        self.put_nowait(cmd)
+
+    def put_nowait(self, cmd: dict):
+        self.received += 1
+        now = time.perf_counter()  # same clock as trace spans
+        func = cmd.get("function")
+        tail = self._items[-1] if self._items else None
+        tail_func = tail.cmd.get("function") if tail else None
+
+        if func in VOLUME_FUNCTIONS and tail_func in VOLUME_FUNCTIONS and self._can_merge_volume(tail, func):
+            if tail.volume_ops is None:
+                tail.volume_ops = [(tail_func, tail.cmd.get("args", {}))]
+            tail.volume_ops.append((func, cmd.get("args", {})))
+            self._drop(tail.cmd, "coalesced", into=cmd)
+            tail.cmd = cmd
+            self._extend(tail, now)
+            self.merged_volume += 1
+        elif func in STATE_FUNCTIONS and tail_func in STATE_FUNCTIONS:
+            # Pause / resume not run yet -> only the last one matters. Dropping
+            # both would lose it when the first was a no-op (resume while playing)
+            self._drop(tail.cmd, "replaced", into=cmd)
+            tail.cmd = cmd
+            self.replaced_state += 1
+        else:
+            if func == "play_music":
+                # Newer song wins over one that hasn't started extracting
+                stale = [p for p in self._items if p.cmd.get("function") == "play_music"]
+                for p in stale:
+                    self._items.remove(p)
+                    self._drop(p.cmd, "replaced", into=cmd)
+                self.replaced_play += len(stale)
+            self._items.append(_Pending(cmd, now, self.debounce, self.max_delay))
+        if cmd.get("trace"):
+            cmd["trace"].mark("queued")
+        self._changed.set()
+
+    @staticmethod
+    def _drop(cmd: dict, status: str, into: dict = None):
+        """Finish the trace of a command that will never execute."""
+        trace = cmd.get("trace")
+        if trace is None:
+            return
+        if into is not None and into.get("trace"):
+            trace.attrs["merged_into"] = into["trace"].id
+        trace.finish(status)
+
+    @staticmethod
+    def _trace_dwell(pending: _Pending):
+        """Debounce hold (with the number of commands merged into it) + total queue time."""
+        trace = pending.cmd.get("trace")
+        if trace is None:
+            return
+        queued = trace.marks.get("queued", pending.queued_at)
+        if pending.ready_at > queued:
+            merged = len(pending.volume_ops) - 1 if pending.volume_ops else 0
+            trace.add_span("debounce", queued, pending.ready_at, merged=merged)
+        trace.span_since("queued", "queue")
+
+    def _can_merge_volume(self, tail: _Pending, func: str) -> bool:
+        # Relative steps need the live level when delivered, unless an absolute level comes first
+        ops = tail.volume_ops or [(tail.cmd.get("function"), None)]
+        return func == "set_volume" or any(f == "set_volume" for f, _ in ops) or self.volume_level is not None
+
+    def _extend(self, pending: _Pending, now: float):
+        """Restart the debounce window (bounded by the first command's deadline)."""
+        pending.ready_at = min(now + self.debounce, pending.deadline)
+
+    def _resolve(self, pending: _Pending) -> dict:
+        if pending.volume_ops is None:
+            return pending.cmd
+        # Replay the steps (with clamping) from the last absolute level, else the current one
+        ops = pending.volume_ops
+        start = max((i for i, (func, _) in enumerate(ops) if func == "set_volume"), default=None)
+        if start is None:
+            level = self.volume_level()
+        else:
+            level = ops[start][1].get("level", 50)
+            ops = ops[start + 1:]
+        for func, args in ops:
+            if func == "volume_up":
+                level = min(100, level + self.volume_step)
+            else:
+                level = max(0, level - self.volume_step)
+        return {
+            "function": "set_volume",
+            "args": {"level": level},
+            "response": f"ปรับเสียงเป็น {level} เปอร์เซ็นต์ครับ",
+            "trace": pending.cmd.get("trace")
+        }
+
+    async def get(self) -> dict:
+        """Next command once its debounce window has passed."""
+        while True:
+            timeout = None
+            if self._items:
+                head = self._items[0]
+                delay = head.ready_at - time.perf_counter()
+                if delay <= 0:
+                    self._items.popleft()
+                    self.delivered += 1
+                    metrics.command_dwell.observe(time.perf_counter() - head.queued_at)
+                    self._trace_dwell(head)
+                    return self._resolve(head)
+                timeout = delay
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "received": self.received,
+            "delivered": self.delivered,
+            "merged": self.merged_volume + self.replaced_play + self.replaced_state,
+            "merged_volume": self.merged_volume,
+            "replaced_play": self.replaced_play,
+            "replaced_state": self.replaced_state,
+        }
@@ -0,0 +1,120 @@
+"""
+Fan-out - Per-client outbound queues for /ws/voice
+Every client has a bounded queue and its own writer task, so one stalled
+browser never delays the others. Broadcasts are serialized once.
+"""
+import json
+import asyncio
+import logging
+
+from config import WS_SEND_QUEUE, WS_SEND_TIMEOUT
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def encode(message: dict) -> str:
+    """Same JSON encoding as WebSocket.send_json."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ClientConnection:
+    """Outbound side of one WebSocket (drop-in for websocket.send_json)."""
+
+    def __init__(self, websocket, hub: "Broadcaster", max_queue: int = WS_SEND_QUEUE,
+                 send_timeout: float = WS_SEND_TIMEOUT):
+        self.websocket = websocket
+        self.hub = hub
+        self.send_timeout = send_timeout
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self._writer = asyncio.create_task(self._write())
+
+    async def send_json(self, message: dict):
+        self.send_text(encode(message))
+
+    def send_text(self, text: str) -> bool:
+        """Queue a serialized message; evicts the client when its queue is full."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self.evict("queue_full")
+            return False
+
+    async def _write(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+                self.hub.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            self.evict("send_timeout")
+        except Exception as e:
+            # Socket already gone - the receive loop cleans up
+            logger.debug(f"WebSocket writer stopped: {e}")
+            self.hub.unregister(self)
+
+    def evict(self, reason: str):
+        """Drop a client that can't keep up (reason: queue_full / send_timeout)."""
+        if self.closed:
+            return
+        logger.warning(f"🐢 Dropping slow web client: {reason}")
+        self.hub.evicted += 1
+        metrics.ws_evicted.labels(reason).inc()
+        self.close()
+        asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+
+    def close(self):
+        self.closed = True
+        self.hub.unregister(self)
+        if not self._writer.done() and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+
+class Broadcaster:
+    """Registry of connected clients."""
+
+    def __init__(self):
+        self.clients = set()
+        self.sent = 0
+        self.broadcasts = 0
+        self.evicted = 0
+
+    def register(self, websocket) -> ClientConnection:
+        client = ClientConnection(websocket, self)
+        self.clients.add(client)
+        return client
+
+    def unregister(self, client: ClientConnection):
+        self.clients.discard(client)
+
+    def broadcast(self, message: dict) -> int:
+        """Queue message for every client (serialized once); returns clients reached."""
+        self.broadcasts += 1
+        text = encode(message)
+        # Snapshot - sends may evict clients while iterating
+        return sum(client.send_text(text) for client in list(self.clients))
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.clients),
+            "broadcasts": self.broadcasts,
+            "sent": self.sent,
+            "evicted": self.evicted,
+            "max_queue_depth": max((c.queue.qsize() for c in self.clients), default=0),
+        }
+
+
+# Global instance
+broadcaster = Broadcaster()
@@ -0,0 +1,132 @@
+"""
+Framing - Binary audio upload protocol for /ws/voice
+Small fixed header + raw audio payload (no base64 / JSON on the audio path)
+
+Frame (network byte order):
+  magic    2 bytes  b"JV"
+  version  uint8    PROTOCOL_VERSION
+  flags    uint8    FLAG_END | FLAG_STREAM
+  codec    uint8    key of CODECS
+  (pad)    1 byte
+  seq      uint32   0 starts a new utterance, +1 per frame
+  payload  ...      encoded audio (may be empty on the END frame)
+"""
+import struct
+from typing import NamedTuple
+
+from config import AUDIO_BUFFER_BYTES, AUDIO_MAX_UPLOAD_BYTES
+
+MAGIC = b"JV"
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("!2sBBBxI")
+
+FLAG_END = 0x01     # Last frame of the utterance -> decode now
+FLAG_STREAM = 0x02  # Decode incrementally and send partial results
+
+# Codec id -> ffmpeg input format (None = let ffmpeg probe)
+CODECS = {
+    0: None,
+    1: "webm",
+    2: "ogg",
+    3: "mp4",
+    4: "wav",
+}
+
+
+class FrameError(Exception):
+    """Malformed, unsupported or out-of-order frame."""
+
+
+class Frame(NamedTuple):
+    seq: int
+    flags: int
+    codec: int
+    payload: memoryview
+
+    @property
+    def end(self) -> bool:
+        return bool(self.flags & FLAG_END)
+
+    @property
+    def stream(self) -> bool:
+        return bool(self.flags & FLAG_STREAM)
+
+    @property
+    def input_format(self) -> str | None:
+        return CODECS[self.codec]
+
+
+def build_frame(seq: int, payload: bytes = b"", codec: int = 1, flags: int = 0) -> bytes:
+    """Encode one frame (used by clients / benchmarks)."""
+    return HEADER.pack(MAGIC, PROTOCOL_VERSION, flags, codec, seq) + payload
+
+
+def parse_frame(data: bytes) -> Frame | None:
+    """
+    Decode a binary WebSocket message.
+    Returns None for an unframed message (legacy: whole clip as raw bytes).
+    """
+    if len(data) < HEADER.size or data[:2] != MAGIC:
+        return None
+    magic, version, flags, codec, seq = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise FrameError(f"Unsupported protocol version {version}")
+    if codec not in CODECS:
+        raise FrameError(f"Unknown codec {codec}")
+    # Zero-copy view of the audio
+    return Frame(seq, flags, codec, memoryview(data)[HEADER.size:])
+
+
+class FrameBuffer:
+    """
+    Preallocated, reusable byte buffer for one connection's utterance.
+    Grows by doubling (rarely - sized for a typical push-to-talk clip).
+    """
+
+    def __init__(self, capacity: int = AUDIO_BUFFER_BYTES, max_bytes: int = AUDIO_MAX_UPLOAD_BYTES):
+        self.data = bytearray(capacity)
+        self.length = 0
+        self.max_bytes = max_bytes
+
+    def append(self, payload):
+        end = self.length + len(payload)
+        if end > self.max_bytes:
+            raise FrameError(f"Upload larger than {self.max_bytes} bytes")
+        if end > len(self.data):
+            self.data.extend(bytes(max(end, 2 * len(self.data)) - len(self.data)))
+        self.data[self.length:end] = payload
+        self.length = end
+
+    def getvalue(self) -> bytes:
+        return bytes(memoryview(self.data)[:self.length])
+
+    def clear(self):
+        self.length = 0  # Keep the allocation for the next utterance
+
+
+class Upload:
+    """Reassembles the frames of one utterance (sequence checked)."""
+
+    def __init__(self):
+        self.buffer = FrameBuffer()
+        self.next_seq = None  # None = no utterance in progress
+        self.input_format = None
+        self.stream = False
+        self.skip = False  # Utterance rejected (e.g. Whisper still loading)
+
+    def start(self, frame: Frame):
+        self.buffer.clear()
+        self.next_seq = 0
+        self.input_format = frame.input_format
+        self.stream = frame.stream
+        self.skip = False
+
+    def accept(self, frame: Frame):
+        """Check ordering of a frame that belongs to the current utterance."""
+        if self.next_seq is None or frame.seq != self.next_seq:
+            expected, self.next_seq = self.next_seq, None
+            raise FrameError(f"Frame out of order: got {frame.seq}, expected {expected}")
+        self.next_seq += 1
+
+    def finish(self):
+        self.next_seq = None
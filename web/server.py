@@ -3,29 +3,45 @@ Web Server - Voice input via browser
 Handles STT and sends commands to Discord bot
 """
 import asyncio
-import base64
-import tempfile
-import os
+import json
 import logging
 from pathlib import Path
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 import uvicorn
 
-from config import WEB_HOST, WEB_PORT
-from ear.transcriber import transcriber
+from config import WEB_HOST, WEB_PORT, STREAM_PARTIAL_INTERVAL
+from ear.scheduler import scheduler as stt_scheduler, TranscriptionBusy
+from ear.pool import pool as stt_pool
+from ear.stream import StreamingSession
 from brain.llm import llm
+from brain.resolver import resolver
+from core.commands import registry, match_command_simple
+from core.readiness import readiness
+from web.framing import parse_frame, FrameError, Upload
+from web.coalesce import CoalescingQueue
+from web.fanout import broadcaster, ClientConnection
+from core.state import state
+from core import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
 
 app = FastAPI(title="Jarvis Voice Assistant")
 
-# Connected clients and command queue
-connected_clients = set()
-command_queue = asyncio.Queue()
+# Command queue (coalesces bursts before Discord executes them)
+# Connected clients live in broadcaster (per-client send queues)
+command_queue = CoalescingQueue()
+metrics.command_queue_depth.func = command_queue.qsize
+
+# Push player / voice state changes to every client
+state.subscribe(lambda version, changes: broadcaster.broadcast({
+    "type": "state",
+    "version": version,
+    "changes": changes
+}))
 
 # Serve static files
 static_dir = Path(__file__).parent / "static"
@@ -44,38 +60,108 @@ async def index():
 
 @app.get("/api/status")
 async def get_status():
-    """Get system status."""
-    from hand.discord_bot import bot_instance
-    
-    discord_connected = False
-    voice_connected = False
-    
-    if bot_instance:
-        discord_connected = bot_instance.is_ready() if hasattr(bot_instance, 'is_ready') else False
-        voice_connected = len(bot_instance.voice_clients) > 0 if hasattr(bot_instance, 'voice_clients') else False
-    
+    """Get system status (bot state comes from the pushed state store)."""
     return {
-        "discord": discord_connected,
-        "voice": voice_connected,
-        "llm": llm.model
+        "discord": state.state["discord"],
+        "voice": state.state["voice"],
+        "llm": llm.model,
+        "llm_requests": llm.stats(),
+        "resolver": resolver.stats(),
+        "stt": stt_scheduler.stats(),
+        "commands": command_queue.stats(),
+        "clients": broadcaster.stats(),
+        "components": readiness.snapshot()
     }
 
 
+@app.get("/api/state")
+async def get_state():
+    """Player / voice state snapshot (live updates: {"type": "state"} on /ws/voice)."""
+    return state.snapshot()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def count_match(result: dict | None):
+    """Match hit/miss by intent."""
+    if result is None:
+        metrics.command_match.labels("none").inc()
+        return
+    metrics.command_match.labels(result["function"]).inc()
+    if result.get("confidence", 1.0) < 1.0:
+        metrics.command_fuzzy.inc()
+
+
+@app.get("/api/debug/traces")
+async def get_traces(limit: int = 50, min_ms: float = 0, source: str = None):
+    """Recent request traces, newest first (min_ms=500 -> only slow ones)."""
+    return {"traces": tracing.store.recent(limit, min_ms, source)}
+
+
+@app.get("/api/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """One trace with all of its spans."""
+    trace = tracing.store.get(trace_id)
+    if trace is None:
+        return JSONResponse({"error": "trace not found"}, status_code=404)
+    return trace.to_dict()
+
+
+@app.get("/api/ready")
+async def get_ready():
+    """Per-component readiness and load times (503 until everything is loaded)."""
+    ready = readiness.all_ready()
+    return JSONResponse(
+        {"ready": ready, "components": readiness.snapshot()},
+        status_code=200 if ready else 503
+    )
+
+
 from pydantic import BaseModel
 
 class CommandRequest(BaseModel):
     text: str
 
 
+class ClientDisconnected(Exception):
+    """The HTTP client went away before its command was resolved."""
+
+
+async def resolve_while_connected(text: str, http: Request, poll: float = 0.5) -> dict | None:
+    """resolver.resolve, cancelled (LLM request included) if the HTTP client goes away."""
+    task = asyncio.create_task(resolver.resolve(text))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll)
+            if done:
+                return task.result()
+            if await http.is_disconnected():
+                raise ClientDisconnected(text)
+    finally:
+        task.cancel()
+
+
 @app.post("/api/command")
-async def receive_command(request: CommandRequest):
+async def receive_command(request: CommandRequest, http: Request):
     """
     Receive text command from external source (e.g. Siri Shortcuts).
     """
+    trace = tracing.start("api", text=request.text)
     logger.info(f"📱 API Command received: {request.text}")
     
-    # Use Strict Matcher
-    result = match_command_simple(request.text)
+    # Rules first, LLM only when they miss
+    with tracing.span("match"):
+        try:
+            result = await resolve_while_connected(request.text, http)
+        except ClientDisconnected:
+            logger.info(f"📱 API client disconnected, resolution cancelled: {request.text}")
+            trace.finish("cancelled")
+            return JSONResponse({"status": "cancelled", "trace_id": trace.id}, status_code=499)
+    count_match(result)
     
     if result:
         logger.info(f"✅ Command matched: {result['function']}")
@@ -84,224 +170,214 @@ async def receive_command(request: CommandRequest):
         await command_queue.put({
             "function": result["function"],
             "args": result["args"],
-            "response": result["response"]
+            "response": result["response"],
+            "trace": trace
         })
         
         return {
             "status": "success",
             "command": result["function"],
-            "response": result["response"]
+            "response": result["response"],
+            "trace_id": trace.id
         }
     else:
         logger.info(f"❌ Command ignored: {request.text}")
+        trace.finish("ignored")
         return {
             "status": "ignored", 
-            "message": "Unknown command"
+            "message": "Unknown command",
+            "trace_id": trace.id
         }
 
 
-def match_command_simple(text: str) -> dict | None:
-    """
-    Match voice commands to intents using strict keyword lists.
-    """
-    cmd = text.strip().lower()
-    
-    # --- Keyword Definitions ---
-    # Intent: play (Prefixes or Exact)
-    PLAY_KEYWORDS = [
-        "เล่น", "เปิด", "เริ่ม", "เริ่มเพลง", "เปิดเพลง", "เล่นเพลง", 
-        "เปิดดนตรี", "เริ่มดนตรี", "เปิดให้หน่อย", "เริ่มให้หน่อย", 
-        "เล่นเลย", "เปิดเลย", "เริ่มเลย", "เอาเพลง",
-        "play", "start"
-    ]
+async def dispatch_command(result: dict, client: ClientConnection):
+    """Send matched command response to client and queue it for Discord."""
+    logger.info(f"✅ Command matched: {result['function']}")
+    if result.get("confidence", 1.0) < 1.0:
+        logger.info(f"🔍 Fuzzy match (confidence {result['confidence']})")
     
-    # Intent: pause (Exact)
-    PAUSE_KEYWORDS = [
-        "หยุด", "พัก", "หยุดเพลง", "หยุดก่อน", "หยุดไว้ก่อน", 
-        "พอ", "พอเพลง", "หยุดดนตรี", "หยุดชั่วคราว",
-        "pause", "stop", "break"
-    ]
+    # Send response to client
+    await client.send_json({
+        "type": "response",
+        "text": result["response"],
+        "function": result["function"],
+        "args": result["args"],
+        "trace_id": tracing.current_id()
+    })
     
-    # Intent: resume (Exact)
-    RESUME_KEYWORDS = [
-        "ต่อ", "เล่นต่อ", "เปิดต่อ", "ไปต่อ", "ต่อเพลง", 
-        "เล่นต่อเลย", "เอาต่อ",
-        "resume", "continue", "unpause"
-    ]
-    
-    # Intent: skip (Exact)
-    SKIP_KEYWORDS = [
-        "ข้าม", "เพลงถัดไป", "ถัดไป", "ข้ามเพลง", "เปลี่ยนเพลง", 
-        "เปลี่ยน", "ไปเพลงหน้า", "เอาเพลงหน้า", "ข้ามเลย",
-        "skip", "next"
-    ]
-    
-    # Intent: join
-    JOIN_KEYWORDS = [
-        "เข้าห้อง", "เข้ามา", "มาในห้อง", "ตามมา",
-        "มาห้องนี้", "เข้าช่อง",
-        "join", "come here"
-    ]
-
-    # Intent: leave
-    LEAVE_KEYWORDS = [
-        "ออก", "ออกจากห้อง", "ออกไป",
-        "ไปได้แล้ว", "เลิกเล่น",
-        "leave", "disconnect", "bye"
-    ]
-
-    # Intent: move
-    MOVE_KEYWORDS = [
-        "ย้ายห้อง", "ย้ายมาห้องนี้",
-        "ตามฉันมา", "เปลี่ยนห้อง",
-        "ย้ายช่อง",
-        "move"
-    ]
-    
-    # Intent: Volume Up
-    VOL_UP_KEYWORDS = [
-        "เพิ่มเสียง", "ดังขึ้น", "เร่งเสียง", "เสียงเบาไป",
-        "louder", "volume up"
-    ]
-    
-    # Intent: Volume Down
-    VOL_DOWN_KEYWORDS = [
-        "ลดเสียง", "เบาลง", "เบาเสียง", "เสียงดังไป",
-        "quieter", "volume down"
-    ]
+    # Queue function for Discord execution (the trace rides along)
+    await command_queue.put({
+        "function": result["function"],
+        "args": result["args"],
+        "response": result["response"],
+        "trace": tracing.current()
+    })
 
-    # --- Matching Logic ---
+
+async def process_text(text: str, client: ClientConnection):
+    """Process text command: rule matcher, LLM fallback on a miss (brain/resolver.py)."""
     
-    # Preprocessing: Remove polite particles and "bot"
-    for noise in ["บอท", "ครับ", "ค่ะ", "jarvis", "จาวิส"]:
-        cmd = cmd.replace(noise, "")
-    cmd = cmd.strip()
-
-    # Pattern: Set Volume (e.g. "เสียง 50")
-    if any(cmd.startswith(p) for p in ["เสียง", "ปรับเสียง", "volume", "vol"]):
-        import re
-        match = re.search(r'\d+', cmd)
-        if match:
-            level = int(match.group())
-            return {
-                "function": "set_volume", 
-                "args": {"level": level}, 
-                "response": f"ปรับเสียงเป็น {level} เปอร์เซ็นต์ครับ"
-            }
-
-    # 1. Start with strict exact matches for simple commands
+    with tracing.span("match"):
+        result = await resolver.resolve(text)
+    count_match(result)
     
-    # Join
-    if cmd in JOIN_KEYWORDS:
-        return {"function": "join", "args": {}, "response": "กำลังเข้าห้องครับ"}
-        
-    # Leave
-    if cmd in LEAVE_KEYWORDS:
-        return {"function": "leave", "args": {}, "response": "กำลังออกจากห้องครับ"}
-        
-    # Move
-    if cmd in MOVE_KEYWORDS:
-        return {"function": "move_channel", "args": {}, "response": "กำลังย้ายห้องครับ"}
-        
-    # Volume Up
-    if cmd in VOL_UP_KEYWORDS:
-        return {"function": "volume_up", "args": {}, "response": "เพิ่มเสียงให้ครับ"}
+    if result:
+        await dispatch_command(result, client)
+    else:
+        logger.info(f"❌ Command ignored: {text}")
+        tracing.finish(tracing.current(), "ignored")
+        await client.send_json({
+            "type": "error",
+            "text": "ไม่เข้าใจคำสั่งครับ (ลองพูด: เล่น, หยุด, ข้าม, ออก)",
+            "trace_id": tracing.current_id()
+        })
+
+
+async def send_busy(client: ClientConnection):
+    """Tell the client the STT queue is full."""
+    logger.warning("⏳ STT busy - clip rejected")
+    tracing.finish(tracing.current(), "busy")
+    await client.send_json({
+        "type": "busy",
+        "text": "ระบบกำลังยุ่ง ลองพูดใหม่อีกครั้งครับ",
+        "trace_id": tracing.current_id()
+    })
+
+
+async def send_loading(client: ClientConnection):
+    """Tell the client Whisper is still loading (text commands still work)."""
+    tracing.finish(tracing.current(), "loading")
+    await client.send_json({
+        "type": "loading",
+        "text": "กำลังโหลดระบบฟังเสียง พิมพ์คำสั่งแทนได้ครับ",
+        "trace_id": tracing.current_id()
+    })
+
+
+async def process_partial(session: StreamingSession, client: ClientConnection):
+    """Run an incremental decode and fire short commands early."""
+    try:
+        pcm = session.partial_pcm()
+        if pcm is None:
+            return
+        try:
+            with tracing.span("stt.partial"):
+                text = await stt_scheduler.transcribe_pcm(pcm, language="th")
+        except TranscriptionBusy:
+            # Partials are best-effort - skip while the STT queue is full
+            return
+        session.set_partial(text)
+        if not text:
+            return
         
-    # Volume Down
-    if cmd in VOL_DOWN_KEYWORDS:
-        return {"function": "volume_down", "args": {}, "response": "ลดเสียงให้ครับ"}
-    
-    # Resume
-    if cmd in RESUME_KEYWORDS:
-        return {"function": "resume_music", "args": {}, "response": "เล่นเพลงต่อครับ"}
+        await client.send_json({
+            "type": "partial",
+            "text": text,
+            "trace_id": tracing.current_id()
+        })
         
-    # Pause
-    if cmd in PAUSE_KEYWORDS:
-        return {"function": "pause_music", "args": {}, "response": "พักเพลงให้แล้วครับ"}
+        if session.fired:
+            return
         
-    # Skip
-    if cmd in SKIP_KEYWORDS:
-        return {"function": "skip", "args": {}, "response": "ข้ามเพลงครับ"}
-    
-    # Play (Exact match without song name -> Resume/Default action)
-    if cmd in PLAY_KEYWORDS:
-        return {"function": "resume_music", "args": {}, "response": "เล่นเพลงต่อครับ"}
-
-    # 2. Check for "Play [song]" pattern (Prefix matching)
-    for prefix in PLAY_KEYWORDS:
-        if cmd.startswith(prefix):
-            # Check if there is actual content after the keyword
-            possible_song = cmd[len(prefix):].strip()
-            if possible_song:
-                return {
-                    "function": "play_music", 
-                    "args": {"song_name": possible_song}, 
-                    "response": f"จัดให้ครับ กำลังค้นหา {possible_song}"
-                }
-    
-    # 3. Other Utility Commands (Legacy)
-    legacy_commands = {
-        "เข้าห้อง": {"func": "join", "args": {}, "resp": "กำลังเข้าห้องเสียงครับ"},
-        "มานี่": {"func": "join", "args": {}, "resp": "มาแล้วครับ"},
-        "ออก": {"func": "leave", "args": {}, "resp": "บ๊ายบายครับ"},
-        "ไปได้": {"func": "leave", "args": {}, "resp": "ผมไปก่อนนะครับ"},
-        "เพิ่มเสียง": {"func": "volume_up", "args": {}, "resp": "เพิ่มเสียงให้ครับ"},
-        "ดังขึ้น": {"func": "volume_up", "args": {}, "resp": "จัดให้ดังขึ้นครับ"},
-        "ลดเสียง": {"func": "volume_down", "args": {}, "resp": "ลดเสียงให้ครับ"},
-        "เบาลง": {"func": "volume_down", "args": {}, "resp": "เบาเสียงลงแล้วครับ"},
-        "ล้างคิว": {"func": "clear_queue", "args": {}, "resp": "ล้างคิวเพลงเรียบร้อย"},
-        "ดูคิว": {"func": "show_queue", "args": {}, "resp": "นี่คือคิวเพลงครับ"},
-        "เปิดวนซ้ำ": {"func": "loop_on", "args": {}, "resp": "เปิดโหมดเล่นวนซ้ำครับ"},
-        "ปิดวนซ้ำ": {"func": "loop_off", "args": {}, "resp": "ปิดโหมดเล่นวนซ้ำแล้วครับ"},
-        "สถานะ": {"func": "show_status", "args": {}, "resp": "สถานะปัจจุบันครับ"},
-        "เงียบ": {"func": "stop_music", "args": {}, "resp": "หยุดทุกอย่างครับ"}
-    }
-    
-    if cmd in legacy_commands:
-        c = legacy_commands[cmd]
-        return {"function": c["func"], "args": c["args"], "response": c["resp"]}
-
-    return None
+        # Fire once the transcription is stable (user finished speaking).
+        # Only phrases no longer utterance can change - a song name may still
+        # follow "เปิด", "เปลี่ยน" may still become "เปลี่ยนห้อง".
+        result = registry.match_complete(text) if session.stable else None
+        if result:
+            logger.info(f"⚡ Early command from partial: {text}")
+            session.fired = result
+            await dispatch_command(result, client)
+    except Exception as e:
+        logger.error(f"Partial transcription error: {e}")
 
 
-async def process_text(text: str, websocket: WebSocket):
-    """Process text command using pure logic (No LLM)."""
+async def finish_stream(session: StreamingSession, partial_task, client: ClientConnection) -> str | None:
+    """Final decode of a streamed utterance. Returns the text still to be resolved, if any."""
+    if partial_task:
+        await partial_task
     
-    # Use Strict Matcher
-    result = match_command_simple(text)
+    logger.info(f"Stream finished: {session.bytes_received} bytes")
+    metrics.audio_upload_bytes.observe(session.bytes_received)
+    trace = tracing.current()
+    if trace:
+        trace.span_since("start", "upload", bytes=session.bytes_received)
+    try:
+        with tracing.span("stt"):
+            pcm = await stt_pool.run_io(session.flush)
+            text = await stt_scheduler.transcribe_pcm(pcm, language="th") if len(pcm) else ""
+    except TranscriptionBusy:
+        await send_busy(client)
+        return None
     
-    if result:
-        logger.info(f"✅ Command matched: {result['function']}")
-        
-        # Send response to client
-        await websocket.send_json({
-            "type": "response",
-            "text": result["response"],
-            "function": result["function"],
-            "args": result["args"]
-        })
-        
-        # Queue function for Discord execution
-        await command_queue.put({
-            "function": result["function"],
-            "args": result["args"],
-            "response": result["response"]
-        })
-    else:
-        logger.info(f"❌ Command ignored: {text}")
-        await websocket.send_json({
+    if not text:
+        if session.fired:
+            # Command already ran from a partial - just end the utterance
+            await client.send_json({
+                "type": "final",
+                "text": "",
+                "trace_id": tracing.current_id()
+            })
+            return None
+        tracing.finish(trace, "no_speech")
+        await client.send_json({
             "type": "error",
-            "text": "ไม่เข้าใจคำสั่งครับ (ลองพูด: เล่น, หยุด, ข้าม, ออก)"
+            "text": "ไม่ได้ยินครับ ลองพูดใหม่",
+            "trace_id": tracing.current_id()
         })
+        return None
+    
+    logger.info(f"Heard: {text}")
+    if trace:
+        trace.attrs["text"] = text
+    await client.send_json({
+        "type": "transcription",
+        "text": text,
+        "trace_id": tracing.current_id()
+    })
+    
+    # One utterance, one command: never dispatch again after an early fire
+    if session.fired:
+        result = match_command_simple(text)
+        if result != session.fired:
+            logger.info(f"⚡ Final text differs from early command {session.fired['function']}: {text}")
+        return None
+    return text
+
+
+def log_task_error(task: asyncio.Task):
+    """Log a failed background command (nothing awaits it)."""
+    if not task.cancelled() and task.exception():
+        logger.error(f"Command processing error: {task.exception()}")
 
 
 @app.websocket("/ws/voice")
 async def voice_websocket(websocket: WebSocket):
-    """WebSocket endpoint for voice and text input."""
+    """
+    WebSocket endpoint for voice and text input.
+    Audio arrives as binary frames (web/framing.py), text commands as JSON.
+    """
     await websocket.accept()
-    connected_clients.add(websocket)
+    client = broadcaster.register(websocket)
     logger.info("Web client connected")
     
+    # Snapshot + version; diffs follow as {"type": "state"}
+    await client.send_json({"type": "state_snapshot", **state.snapshot()})
+    
+    # Upload state (one utterance at a time per connection)
+    upload = Upload()
+    stream = None
+    partial_task = None
+    
+    # Resolution may wait on the LLM - run it beside the receive loop so
+    # frames, pings and a disconnect are still read (cancelled on close)
+    resolving = set()
+    
+    def resolve_later(text: str):
+        task = asyncio.create_task(process_text(text, client))
+        resolving.add(task)
+        task.add_done_callback(resolving.discard)
+        task.add_done_callback(log_task_error)
+    
     try:
         while True:
             # Receive message
@@ -310,71 +386,155 @@ async def voice_websocket(websocket: WebSocket):
                 logger.info("WebSocket disconnect received")
                 break
             
-            # ... (rest of logic handles binary/json) ...
-            
             audio_bytes = None
+            audio_format = "webm"
             
             if "bytes" in message and message["bytes"]:
-                # Binary audio data (faster path)
-                audio_bytes = message["bytes"]
+                metrics.audio_bytes.inc(len(message["bytes"]))
+                try:
+                    frame = parse_frame(message["bytes"])
+                    if frame is None:
+                        # Unframed binary = whole clip (legacy clients)
+                        audio_bytes = message["bytes"]
+                        tracing.start("voice", format="webm")
+                    else:
+                        if frame.seq == 0:
+                            # New utterance - abandon any unfinished one
+                            if stream:
+                                stream.close()
+                                stream = None
+                            upload.start(frame)
+                            tracing.start("voice", format=upload.input_format)
+                            if readiness.is_loading("whisper"):
+                                upload.skip = True
+                                await send_loading(client)
+                            elif upload.stream and upload.input_format in ("webm", "ogg"):
+                                # WebM/Ogg decode incrementally -> partial results
+                                stream = StreamingSession(input_format=upload.input_format)
+                                partial_task = None
+                                logger.info("Audio stream started")
+                        elif upload.skip:
+                            if frame.end:
+                                upload.finish()
+                            continue
+                        
+                        upload.accept(frame)
+                        if upload.skip:
+                            if frame.end:
+                                upload.finish()
+                            continue
+                        
+                        if len(frame.payload):
+                            if stream:
+                                # Streaming frame: feed decoder, schedule partial decode
+                                await stt_pool.run_io(stream.feed, frame.payload)
+                                if (partial_task is None or partial_task.done()) and stream.pending_sec() >= STREAM_PARTIAL_INTERVAL:
+                                    partial_task = asyncio.create_task(process_partial(stream, client))
+                            else:
+                                upload.buffer.append(frame.payload)
+                        
+                        if not frame.end:
+                            continue
+                        
+                        # End of utterance -> decode now
+                        upload.finish()
+                        if stream:
+                            session, stream = stream, None
+                            text = await finish_stream(session, partial_task, client)
+                            partial_task = None
+                            if text:
+                                resolve_later(text)
+                            continue
+                        audio_bytes = upload.buffer.getvalue()
+                        audio_format = upload.input_format
+                except FrameError as e:
+                    logger.warning(f"Bad audio frame: {e}")
+                    upload.skip = True
+                    if stream:
+                        stream.close()
+                        stream = None
+                    tracing.finish(tracing.current(), "bad_frame")
+                    await client.send_json({
+                        "type": "error",
+                        "text": "ส่งเสียงไม่สมบูรณ์ ลองพูดใหม่ครับ",
+                        "trace_id": tracing.current_id()
+                    })
+                    continue
             elif "text" in message and message["text"]:
-                # JSON message
-                import json
+                # JSON message (text commands only - audio is binary frames)
                 try:
                     data = json.loads(message["text"])
                     if data.get("type") == "audio":
-                        audio_base64 = data.get("data", "")
-                        audio_bytes = base64.b64decode(audio_base64)
-                    elif data.get("type") == "text":
+                        # Old base64 JSON upload - audio is binary frames now (web/framing.py)
+                        logger.warning("Legacy JSON audio message rejected")
+                        await client.send_json({
+                            "type": "error",
+                            "code": "binary_frames_required",
+                            "text": "หน้าเว็บเป็นเวอร์ชันเก่า กรุณารีเฟรชหน้าเว็บแล้วลองพูดใหม่ครับ"
+                        })
+                        continue
+                    if data.get("type") == "state_sync":
+                        # Client missed a version - resend the full state
+                        await client.send_json({"type": "state_snapshot", **state.snapshot()})
+                        continue
+                    if data.get("type") == "text":
                         # Text command direct handling
                         text_command = data.get("text", "").strip()
                         if text_command:
+                            tracing.start("text", text=text_command)
                             logger.info(f"Text command received: {text_command}")
-                            await process_text(text_command, websocket)
+                            resolve_later(text_command)
                             continue
                 except Exception as e:
                     logger.error(f"JSON parse error: {e}")
             
             if audio_bytes and len(audio_bytes) > 1000:
-                # Save to temp file
-                with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as f:
-                    f.write(audio_bytes)
-                    temp_path = f.name
-                
                 logger.info(f"Audio received: {len(audio_bytes)} bytes")
+                metrics.audio_upload_bytes.observe(len(audio_bytes))
+                trace = tracing.current()
+                trace.span_since("start", "upload", bytes=len(audio_bytes))
                 
+                if readiness.is_loading("whisper"):
+                    await send_loading(client)
+                    continue
+                
+                # Transcribe with Whisper (micro-batched with other clients)
+                # Decoded in memory - no temp files
+                # Force Thai language for better performance
                 try:
-                    # Transcribe with Whisper (run in thread to avoid blocking event loop)
-                    # Force Thai language for better performance
-                    text = await asyncio.to_thread(transcriber.transcribe, temp_path, language="th")
+                    with tracing.span("stt"):
+                        text = await stt_scheduler.transcribe_bytes(audio_bytes, language="th", input_format=audio_format)
+                except TranscriptionBusy:
+                    await send_busy(client)
+                    continue
+                
+                if text:
+                    logger.info(f"Heard: {text}")
+                    trace.attrs["text"] = text
                     
-                    if text:
-                        logger.info(f"Heard: {text}")
-                        
-                        # Send transcription to client
-                        await websocket.send_json({
-                            "type": "transcription",
-                            "text": text
-                        })
-                        
-                        # Process text command
-                        await process_text(text, websocket)
-                    else:
-                        await websocket.send_json({
-                            "type": "error",
-                            "text": "ไม่ได้ยินครับ ลองพูดใหม่"
-                        })
-                        
-                finally:
-                    try:
-                        os.unlink(temp_path)
-                    except:
-                        pass
+                    # Send transcription to client
+                    await client.send_json({
+                        "type": "transcription",
+                        "text": text,
+                        "trace_id": tracing.current_id()
+                    })
+                    
+                    # Process text command
+                    resolve_later(text)
+                else:
+                    trace.finish("no_speech")
+                    await client.send_json({
+                        "type": "error",
+                        "text": "ไม่ได้ยินครับ ลองพูดใหม่",
+                        "trace_id": tracing.current_id()
+                    })
             elif audio_bytes:
                 # Audio too short
-                await websocket.send_json({
+                tracing.finish(tracing.current(), "too_short")
+                await client.send_json({
                     "type": "error",
-                    "text": "เสียงสั้นเกินไป กดค้างนานขึ้นครับ"
+                    "text": "เสียงสั้นเกินไป กดค้างนานขึ้นครับ",
+                    "trace_id": tracing.current_id()
                 })
                     
     except WebSocketDisconnect:
@@ -382,20 +542,24 @@ async def voice_websocket(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        connected_clients.discard(websocket)
+        client.close()
+        if partial_task and not partial_task.done():
+            partial_task.cancel()
+        for task in list(resolving):
+            # Cancels an in-flight LLM request too (brain/llm.py)
+            task.cancel()
+        if stream:
+            stream.close()
 
 
 async def broadcast(message: dict):
-    """Broadcast message to all connected web clients."""
-    for client in connected_clients:
-        try:
-            await client.send_json(message)
-        except:
-            pass
+    """Broadcast message to all connected web clients (queued per client, never blocks)."""
+    broadcaster.broadcast(message)
 
 
 async def run_server():
     """Run the web server."""
+    state.bind(asyncio.get_running_loop())
     config = uvicorn.Config(app, host=WEB_HOST, port=WEB_PORT, log_level="info")
     server = uvicorn.Server(config)
     try: